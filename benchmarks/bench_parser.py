@@ -0,0 +1,78 @@
+"""
+Parser throughput benchmark
+Compares the original per-line parser with the fast-path parser on the same
+lines and checks that both accept/reject exactly the same rows.
+
+Usage: python benchmarks/bench_parser.py [data file] [repeats]
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.file_handler import read_sales_data, parse_transactions
+
+def reference_parse(raw_lines):
+    """
+    The original parse_transactions loop (split + replace + int/float + dict
+    per line) plus the date check done the naive way: strptime on every row
+    """
+    clean_transactions = []
+    for line in raw_lines:
+        parts = line.split('|')
+        if len(parts) != 8:
+            continue
+        tid, date, pid, pname, qty, price, cid, region = parts
+        pname = pname.replace(',', '')
+        qty_str = qty.replace(',', '')
+        price_str = price.replace(',', '')
+        try:
+            qty_val = int(qty_str)
+            price_val = float(price_str)
+            if (not cid.strip() or not region.strip() or
+                qty_val <= 0 or price_val <= 0 or
+                not tid.startswith('T')):
+                continue
+            datetime.strptime(date, '%Y-%m-%d')
+            clean_transactions.append({
+                'TransactionID': tid, 'Date': date, 'ProductID': pid, 'ProductName': pname,
+                'Quantity': qty_val, 'UnitPrice': price_val, 'CustomerID': cid, 'Region': region
+            })
+        except ValueError:
+            continue
+    return clean_transactions
+
+def best_time(func, repeats):
+    """Best wall time of func() over repeats runs"""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    filename = sys.argv[1] if len(sys.argv) > 1 else 'data/sales_data.txt'
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    lines = read_sales_data(filename)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        same = repr(reference_parse(lines)) == repr(parse_transactions(lines))  # repr: NaN-safe
+    print(f"Rows: {len(lines):,} | same accept/reject and values: {same}")
+
+    for name, func in [
+        ('reference (dicts)', lambda: reference_parse(lines)),
+        ('fast path (dicts)', lambda: parse_transactions(lines)),
+        ('fast path (columns)', lambda: parse_transactions(lines, columnar=True)),
+    ]:
+        elapsed = best_time(func, repeats)
+        print(f"{name:<22} {len(lines) / elapsed:>12,.0f} rows/s")
+
+if __name__ == "__main__":
+    main()
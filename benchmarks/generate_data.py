@@ -0,0 +1,143 @@
+"""
+Seeded synthetic sales data generator
+Writes a pipe-delimited file in the data/sales_data.txt format with skewed
+regions/products/customers and the same dirty-row patterns as the real
+exports: comma thousands separators, commas in product names, zero
+quantities, missing CustomerID/Region, bad TransactionIDs and rows with the
+wrong number of fields.
+
+Usage: python benchmarks/generate_data.py ROWS OUTPUT [--seed N]
+"""
+import argparse
+import random
+from datetime import date, timedelta
+
+HEADER = "TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region"
+
+REGIONS = ['North', 'South', 'East', 'West']
+REGION_WEIGHTS = [40, 25, 20, 15]
+
+BASE_PRODUCTS = [
+    ('Laptop', 45000), ('Mouse', 650), ('Wireless Mouse', 1100), ('Keyboard', 1800),
+    ('Monitor', 16500), ('Webcam', 3600), ('Headphones', 2800), ('USB Cable', 230),
+    ('External Hard Drive', 5200), ('Laptop Charger', 1900)
+]
+
+# Share of rows per dirty pattern
+DIRTY_RATES = {
+    'comma_price': 0.05,
+    'comma_name': 0.02,
+    'zero_quantity': 0.01,
+    'missing_customer': 0.005,
+    'missing_region': 0.005,
+    'bad_transaction_id': 0.005,
+    'bad_field_count': 0.002,
+}
+
+BATCH_ROWS = 10000
+
+def zipf_weights(n, s=1.1):
+    """Zipf-like weights: a few items get most of the volume"""
+    return [1 / (rank ** s) for rank in range(1, n + 1)]
+
+def build_catalog(products):
+    """Product catalog of (ProductID, ProductName, base price), P101 upwards"""
+    catalog = []
+    for i in range(products):
+        name, price = BASE_PRODUCTS[i % len(BASE_PRODUCTS)]
+        if i >= len(BASE_PRODUCTS):
+            name = f"{name} {i // len(BASE_PRODUCTS)}"
+        catalog.append((f"P{101 + i}", name, price))
+    return catalog
+
+def generate_rows(rows, seed=42, products=200, customers=None, days=365, start=date(2024, 1, 1)):
+    """Yields data lines (without newline) for a seeded synthetic dataset"""
+    rng = random.Random(seed)
+    customers = customers or max(50, rows // 20)
+    catalog = build_catalog(products)
+    product_cum = list(_cumulative(zipf_weights(products)))
+    customer_cum = list(_cumulative(zipf_weights(customers, 0.8)))
+    region_cum = list(_cumulative(REGION_WEIGHTS))
+    dates = [(start + timedelta(days=d)).isoformat() for d in range(days)]
+    dirty = list(DIRTY_RATES.items())
+
+    produced = 0
+    while produced < rows:
+        batch = min(BATCH_ROWS, rows - produced)
+        product_picks = rng.choices(catalog, cum_weights=product_cum, k=batch)
+        customer_picks = rng.choices(range(1, customers + 1), cum_weights=customer_cum, k=batch)
+        region_picks = rng.choices(REGIONS, cum_weights=region_cum, k=batch)
+
+        for i in range(batch):
+            pid, name, base_price = product_picks[i]
+            fields = [
+                f"T{produced + i + 1:06d}",
+                rng.choice(dates),
+                pid,
+                name,
+                str(rng.randint(1, 10)),
+                str(max(1, int(base_price * rng.uniform(0.85, 1.15)))),
+                f"C{customer_picks[i]:03d}",
+                region_picks[i]
+            ]
+
+            r = rng.random()
+            for pattern, rate in dirty:
+                if r >= rate:
+                    r -= rate
+                    continue
+                if pattern == 'comma_price':
+                    fields[5] = f"{int(fields[5]):,}"
+                elif pattern == 'comma_name':
+                    fields[3] = fields[3].replace(' ', ',', 1) if ' ' in fields[3] else fields[3] + ',Pro'
+                elif pattern == 'zero_quantity':
+                    fields[4] = '0'
+                elif pattern == 'missing_customer':
+                    fields[6] = ''
+                elif pattern == 'missing_region':
+                    fields[7] = ''
+                elif pattern == 'bad_transaction_id':
+                    fields[0] = 'X' + fields[0][1:]
+                elif pattern == 'bad_field_count':
+                    fields.pop()
+                break
+
+            yield "|".join(fields)
+        produced += batch
+
+def _cumulative(weights):
+    total = 0
+    for w in weights:
+        total += w
+        yield total
+
+def write_dataset(filename, rows, seed=42, **options):
+    """Writes a synthetic dataset to filename; returns the number of data rows"""
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(HEADER + "\n")
+        chunk = []
+        for line in generate_rows(rows, seed, **options):
+            chunk.append(line)
+            if len(chunk) >= BATCH_ROWS:
+                f.write("\n".join(chunk) + "\n")
+                chunk = []
+        if chunk:
+            f.write("\n".join(chunk) + "\n")
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic pipe-delimited sales data")
+    parser.add_argument('rows', type=int, help="number of data rows (e.g. 10000 to 50000000)")
+    parser.add_argument('output', help="output file")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--products', type=int, default=200)
+    parser.add_argument('--customers', type=int, default=None, help="default: rows / 20")
+    parser.add_argument('--days', type=int, default=365)
+    args = parser.parse_args()
+
+    write_dataset(args.output, args.rows, args.seed, products=args.products,
+                  customers=args.customers, days=args.days)
+    print(f"Wrote {args.rows:,} rows to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Pipeline benchmark suite
+Generates seeded synthetic datasets (see generate_data.py), runs the whole
+pipeline on each one and times every stage: read, parse, validate,
+aggregate, analysis, enrich (incl. writing the enriched file) and report.
+Each dataset size runs in its own process so peak RSS is per size; each
+stage's own peak RSS is recorded where the platform can reset the peak
+(Linux), otherwise it is reported as unavailable.
+
+The result is a JSON baseline; --compare checks a new run against one and
+exits with status 1 if any stage got slower than the tolerance allows.
+
+Usage:
+    python benchmarks/run_benchmarks.py --sizes 10000,100000 --output baseline.json
+    python benchmarks/run_benchmarks.py --sizes 10000,100000 --compare baseline.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.generate_data import write_dataset
+from utils.metrics import peak_rss_bytes, reset_peak_rss, peak_rss_since_reset
+
+STAGES = ['read', 'parse', 'validate', 'aggregate', 'analysis', 'enrich', 'report']
+DEFAULT_SIZES = [10000, 100000]
+CATALOG_SIZE = 194  # Same size as the DummyJSON catalog: P101-P194 match, the rest fail
+
+def synthetic_mapping(size=CATALOG_SIZE):
+    """Offline stand-in for create_product_mapping(fetch_all_products())"""
+    return {
+        p_id: {'title': f"Product {p_id}", 'category': 'electronics',
+               'brand': 'Generic', 'rating': 4.5}
+        for p_id in range(1, size + 1)
+    }
+
+def to_mb(size):
+    """Bytes to MB (None stays None)"""
+    return size / (1024 * 1024) if size is not None else None
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None if unavailable)"""
+    return to_mb(peak_rss_bytes())
+
+def format_mb(value):
+    return f"{value:.1f} MB" if value is not None else "n/a"
+
+def run_pipeline(filename, workdir):
+    """
+    Runs every pipeline stage once (output files go to workdir)
+    Returns: {stage: {'seconds': ..., 'peak_rss_mb': ...}}; peak_rss_mb is the
+             stage's own peak, None where the peak cannot be reset
+    """
+    from utils.file_handler import read_sales_data, parse_transactions, validate_and_filter
+    from utils.data_processor import (
+        aggregate_transactions, calculate_total_revenue, region_wise_sales,
+        top_selling_products, customer_analysis, daily_sales_trend,
+        find_peak_sales_day, low_performing_products, enrich_sales_data
+    )
+    from utils.report_generator import generate_sales_report
+
+    mapping = synthetic_mapping()
+    results = {}
+    state = {}
+
+    def analysis():
+        aggregates = state['aggregates']
+        calculate_total_revenue(None, aggregates)
+        region_wise_sales(None, aggregates)
+        top_selling_products(None, aggregates=aggregates)
+        customer_analysis(None, aggregates)
+        daily_sales_trend(None, aggregates)
+        find_peak_sales_day(None, aggregates)
+        low_performing_products(None, aggregates=aggregates)
+
+    steps = [
+        ('read', lambda: state.update(lines=read_sales_data(filename))),
+        ('parse', lambda: state.update(parsed=parse_transactions(state['lines'], state.setdefault('stats', {})))),
+        ('validate', lambda: state.update(valid=validate_and_filter(state['parsed'], stats=state['stats'])[0])),
+        ('aggregate', lambda: state.update(aggregates=aggregate_transactions(state['valid']))),
+        ('analysis', analysis),
+        ('enrich', lambda: state.update(enriched=enrich_sales_data(state['valid'], mapping))),
+        ('report', lambda: generate_sales_report(
+            state['valid'], state['enriched'], os.path.join(workdir, 'sales_report.txt'),
+            aggregates=state['aggregates'])),
+    ]
+
+    # enrich_sales_data writes data/enriched_sales_data.txt relative to the cwd
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        for name, step in steps:
+            per_stage = reset_peak_rss()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                step()
+            seconds = time.perf_counter() - start
+            peak = to_mb(peak_rss_since_reset()) if per_stage else None
+            results[name] = {'seconds': seconds, 'peak_rss_mb': peak}
+    finally:
+        os.chdir(cwd)
+
+    results['_rows'] = {'input': len(state['lines']), 'valid': len(state['valid'])}
+    return results
+
+def bench_file(filename, repeats):
+    """
+    Best-of-repeats time per stage for one dataset
+    Returns: result dictionary for one size
+    """
+    best = {}
+    rows = None
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(repeats):
+            run = run_pipeline(filename, workdir)
+            rows = run.pop('_rows')
+            for name, stage in run.items():
+                if name not in best:
+                    best[name] = stage
+                else:
+                    best[name]['seconds'] = min(best[name]['seconds'], stage['seconds'])
+                    peaks = [p for p in (best[name]['peak_rss_mb'], stage['peak_rss_mb']) if p is not None]
+                    best[name]['peak_rss_mb'] = max(peaks) if peaks else None
+
+    for stage in best.values():
+        stage['rows_per_s'] = rows['input'] / stage['seconds'] if stage['seconds'] else None
+    # ru_maxrss and the per-stage peaks (VmHWM) are sampled differently; keep the larger
+    peaks = [p for p in [peak_rss_mb()] + [stage['peak_rss_mb'] for stage in best.values()] if p is not None]
+    return {
+        'rows': rows['input'],
+        'valid_rows': rows['valid'],
+        'file_bytes': os.path.getsize(filename),
+        'total_seconds': sum(stage['seconds'] for stage in best.values()),
+        'peak_rss_mb': max(peaks) if peaks else None,
+        'per_stage_rss': all(stage['peak_rss_mb'] is not None for stage in best.values()),
+        'stages': best
+    }
+
+def bench_size(size, seed, repeats, data_dir):
+    """Generates (or reuses) the dataset for size and benchmarks it in a fresh process"""
+    filename = os.path.join(data_dir, f"synthetic_{size}_{seed}.txt")
+    if not os.path.exists(filename):
+        print(f"Generating {size:,} rows...")
+        write_dataset(filename, size, seed)
+
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--single', filename, '--repeats', str(repeats)],
+        check=True, stdout=subprocess.PIPE, text=True, cwd=ROOT
+    ).stdout
+    return json.loads(output)
+
+def print_results(results):
+    for size, result in results['runs'].items():
+        print(f"\n{int(size):,} rows ({result['valid_rows']:,} valid) - "
+              f"total {result['total_seconds']:.3f}s, peak RSS {format_mb(result['peak_rss_mb'])}")
+        for name in STAGES:
+            stage = result['stages'][name]
+            print(f"  {name:<10} {stage['seconds']:>9.4f}s {stage['rows_per_s'] or 0:>14,.0f} rows/s "
+                  f"{format_mb(stage['peak_rss_mb']):>12}")
+        if not result.get('per_stage_rss'):
+            print("  (per-stage peak RSS is unavailable on this platform; only the process peak is shown)")
+
+def compare(results, baseline, tolerance):
+    """
+    Prints each stage's time relative to the baseline
+    Returns: number of stages slower than (1 + tolerance) x baseline
+    """
+    regressions = 0
+    print(f"\nComparison with baseline (tolerance {tolerance:.0%}):")
+    for size, result in results['runs'].items():
+        base = baseline['runs'].get(size)
+        if base is None:
+            print(f"  {int(size):,} rows: not in baseline")
+            continue
+        for name in STAGES + ['total']:
+            new = result['total_seconds'] if name == 'total' else result['stages'][name]['seconds']
+            old = base['total_seconds'] if name == 'total' else base['stages'][name]['seconds']
+            ratio = new / old if old else 1.0
+            flag = ''
+            if ratio > 1 + tolerance:
+                flag = '  REGRESSION'
+                regressions += 1
+            print(f"  {int(size):>10,} {name:<10} {old:>9.4f}s -> {new:>9.4f}s ({ratio:.2f}x){flag}")
+        if base['peak_rss_mb'] and result['peak_rss_mb'] is not None:
+            rss_ratio = result['peak_rss_mb'] / base['peak_rss_mb']
+            print(f"  {int(size):>10,} {'peak RSS':<10} {base['peak_rss_mb']:>8.1f}MB -> "
+                  f"{result['peak_rss_mb']:>8.1f}MB ({rss_ratio:.2f}x)")
+        else:
+            print(f"  {int(size):>10,} {'peak RSS':<10} n/a")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sales analytics pipeline")
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help="comma-separated row counts (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeats', type=int, default=3, help="best-of-N per stage")
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'sales_bench'),
+                        help="where generated datasets are kept and reused")
+    parser.add_argument('--output', help="write results as JSON (e.g. a new baseline)")
+    parser.add_argument('--compare', help="baseline JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed slowdown before a stage counts as a regression")
+    parser.add_argument('--single', help=argparse.SUPPRESS)  # internal: benchmark one file
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(bench_file(args.single, args.repeats)))
+        return
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'seed': args.seed,
+            'repeats': args.repeats,
+            'created': time.strftime('%Y-%m-%d %H:%M:%S')
+        },
+        'runs': {}
+    }
+    for size in (int(s) for s in args.sizes.split(',')):
+        results['runs'][str(size)] = bench_size(size, args.seed, args.repeats, args.data_dir)
+
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,97 +1,405 @@
 import sys
 import os
-from utils.file_handler import read_sales_data
-from utils.api_handler import fetch_all_products, create_product_mapping
+import re
+import json
+import argparse
+from utils.file_handler import (
+    read_sales_sources, parse_sources, validate_and_filter, is_gzip, load_transactions_cached
+)
+from utils.parallel import parallel_parse
+from utils.api_handler import start_product_fetch, create_product_mapping
 from utils.data_processor import (
-    parse_transactions, validate_and_filter, enrich_sales_data,
+    enrich_sales_data, save_enriched_data, aggregate_transactions, aggregate_filters,
     calculate_total_revenue, region_wise_sales, top_selling_products,
-    customer_analysis, daily_sales_trend
+    extract_product_ids, set_distinct_mode, set_analytics_backend, OUTPUT_FORMATS,
+    DISTINCT_MODES, ANALYTICS_BACKENDS
 )
-from utils.report_generator import generate_sales_report
+from utils.report_generator import generate_sales_report, REPORT_FORMATS, SECTIONS
+from utils.incremental import summarize_enrichment_from_keys, incremental_report, CHECKPOINT_FILE
+from utils.filter_index import FilterIndex
+from utils.metrics import PipelineMetrics, PROFILE_MODES, METRICS_JSON, METRICS_PROM, file_size
+from utils.service import serve, DEFAULT_HOST, DEFAULT_PORT
+
+DATA_FILE = 'data/sales_data.txt'
+ENRICHED_FILE = 'data/enriched_sales_data.txt'
+REPORT_FILE = 'output/sales_report.txt'
+ENRICH_MODES = ('catalog', 'ids')
+
+# Filter names become part of the per-filter report file names
+FILTER_NAME = re.compile(r'[A-Za-z0-9_-]+')
+FILTER_KEYS = {'region': 'region', 'min': 'min_amount', 'min_amount': 'min_amount',
+               'max': 'max_amount', 'max_amount': 'max_amount'}
+
+def parse_filter_spec(text, number):
+    """
+    Parses a --filter value: '[name:]region=North,min=5000,max=20000'
+    Returns: {'name', 'region', 'min_amount', 'max_amount'}
+    Raises: ValueError for unknown keys or bad amounts
+    """
+    name, _, body = text.rpartition(':')
+    spec = {'name': name or f"filter{number}", 'region': None, 'min_amount': None, 'max_amount': None}
+    for part in filter(None, (p.strip() for p in body.split(','))):
+        key, _, value = part.partition('=')
+        field = FILTER_KEYS.get(key.strip().lower())
+        if field is None:
+            raise ValueError(f"unknown filter key '{key}' in '{text}' (use region, min, max)")
+        spec[field] = value.strip() if field == 'region' else float(value)
+    return spec
+
+def load_filter_file(filename, first_number):
+    """Loads filter specs from a JSON list of {'name', 'region', 'min_amount', 'max_amount'}"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    specs = []
+    for number, entry in enumerate(entries, first_number):
+        specs.append({
+            'name': entry.get('name') or f"filter{number}",
+            'region': entry.get('region'),
+            'min_amount': entry.get('min_amount'),
+            'max_amount': entry.get('max_amount')
+        })
+    return specs
+
+def parse_args(argv=None):
+    """Command-line options; with none of the filter options the run is interactive"""
+    parser = argparse.ArgumentParser(description="Sales Analytics System")
+    parser.add_argument('--input', default=DATA_FILE,
+                        help="sales data file, directory or glob; .gz files are read as streams "
+                             "(default: %(default)s)")
+    parser.add_argument('--enriched-output', default=ENRICHED_FILE,
+                        help="enriched data file (default: %(default)s)")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default=None,
+                        help="enriched data format (default: from the file extension)")
+    parser.add_argument('--report', default=REPORT_FILE, help="report file (default: %(default)s)")
+    parser.add_argument('--report-format', choices=REPORT_FORMATS, default=None,
+                        help="report format (default: from the report's extension, else text)")
+    parser.add_argument('--sections', help=f"comma-separated report sections (default: all of {','.join(SECTIONS)})")
+    parser.add_argument('--batch', action='store_true', help="run without prompts")
+    parser.add_argument('--region', help="only transactions from this region")
+    parser.add_argument('--min-amount', type=float, help="minimum transaction amount")
+    parser.add_argument('--max-amount', type=float, help="maximum transaction amount")
+    parser.add_argument('--filter', action='append', default=[], metavar='SPEC',
+                        help="extra report for '[name:]region=R,min=X,max=Y'; repeatable, "
+                             "all specs are evaluated in one scan")
+    parser.add_argument('--filter-file', help="JSON list of extra filter specs")
+    parser.add_argument('--report-dir', help="directory for the per-filter reports "
+                                             "(default: the report's directory)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only parse rows appended since the last run and update the report "
+                             "from the checkpoint (a plain, append-only input file, no filters)")
+    parser.add_argument('--checkpoint', default=CHECKPOINT_FILE,
+                        help="--incremental state file (default: %(default)s)")
+    parser.add_argument('--enrich-mode', choices=ENRICH_MODES, default='catalog',
+                        help="catalog: fetch the whole product catalog while the input is read; "
+                             "ids: fetch only the product IDs in the input once it is parsed "
+                             "(default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="processes for reading and parsing the input (default: 1, in-process)")
+    parser.add_argument('--no-parse-cache', action='store_true',
+                        help="always re-parse a single plain input file instead of using its "
+                             "<file>.colcache sidecar")
+    parser.add_argument('--backend', choices=ANALYTICS_BACKENDS, default='python',
+                        help="aggregation engine; numpy needs NumPy and is only imported when selected "
+                             "(default: %(default)s)")
+    parser.add_argument('--distinct', choices=DISTINCT_MODES, default='exact',
+                        help="unique customers per day: exact sets or HyperLogLog sketches")
+    parser.add_argument('--hll-precision', type=int, default=None,
+                        help="HyperLogLog precision, 4-18 (default: 12, ~1.6%% error)")
+    parser.add_argument('--serve', action='store_true',
+                        help="keep the dataset in memory and answer queries over HTTP instead of running once")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="--serve address (default: %(default)s)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="--serve port (default: %(default)s)")
+    parser.add_argument('--metrics-json', default=METRICS_JSON, help="(default: %(default)s)")
+    parser.add_argument('--metrics-prom', default=METRICS_PROM, help="(default: %(default)s)")
+    parser.add_argument('--profile-stage', default=os.environ.get('SALES_PROFILE_STAGE'),
+                        help="profile one pipeline stage (e.g. parse)")
+    parser.add_argument('--profile-mode', choices=PROFILE_MODES,
+                        default=os.environ.get('SALES_PROFILE_MODE', 'cpu'))
+    args = parser.parse_args(argv)
+
+    try:
+        args.filters = [parse_filter_spec(text, n) for n, text in enumerate(args.filter, 1)]
+        if args.filter_file:
+            args.filters += load_filter_file(args.filter_file, len(args.filters) + 1)
+    except (OSError, ValueError, AttributeError) as e:
+        parser.error(f"invalid filter: {e}")
+
+    try:
+        set_distinct_mode(args.distinct, args.hll_precision)
+    except ValueError as e:
+        parser.error(str(e))
+
+    try:
+        set_analytics_backend(args.backend)
+    except (ValueError, ImportError) as e:
+        parser.error(str(e))
+
+    args.sections = [name.strip() for name in args.sections.split(',')] if args.sections else None
+    unknown = [name for name in args.sections or [] if name not in SECTIONS]
+    if unknown:
+        parser.error(f"unknown report sections {unknown}; choose from {list(SECTIONS)}")
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    names = [spec['name'] for spec in args.filters]
+    bad = [name for name in names if not (isinstance(name, str) and FILTER_NAME.fullmatch(name))]
+    if bad:
+        parser.error(f"invalid filter names {bad}; use letters, digits, '_' and '-' only")
+    if len(set(names)) != len(names):
+        parser.error("filter names must be unique")
+
+    if args.serve and not os.path.isfile(args.input):
+        parser.error("--serve needs a single input file (not a directory or glob)")
+
+    if args.incremental:
+        # The checkpoint holds the unfiltered aggregates of one append-only file
+        if args.region or args.min_amount is not None or args.max_amount is not None or args.filters:
+            parser.error("--incremental does not combine with --region/--min-amount/--max-amount/--filter")
+        if args.serve:
+            parser.error("--incremental does not combine with --serve")
+        if args.enrich_mode == 'ids':
+            parser.error("--incremental does not combine with --enrich-mode ids")
+        if not os.path.isfile(args.input) or is_gzip(args.input):
+            parser.error("--incremental needs a single uncompressed input file")
+
+    args.interactive = not (args.batch or args.region or args.min_amount is not None or
+                            args.max_amount is not None or args.filters)
+    return args
 
-def main():
+def read_and_parse(args, metrics):
+    """
+    Steps [1/10] and [2/10]: reads and parses the input
+    With --workers N the worker processes read and parse it (byte ranges of
+    one file, else one file per task) and their rows are used for the rest
+    of the run; otherwise a single uncompressed file goes through the parse
+    cache (load_transactions_cached) unless --no-parse-cache is given
+    Returns: (parsed rows, parse stats), or (None, None) if nothing was read
+    """
+    parse_stats = {}
+    print("[1/10] Reading sales data...")
+    if (args.workers == 1 and not args.no_parse_cache and
+            os.path.isfile(args.input) and not is_gzip(args.input)):
+        print("[2/10] Parsing and cleaning data (parse cache)...")
+        with metrics.stage('parse') as record:
+            parsed_data = load_transactions_cached(args.input, stats=parse_stats)
+            record['bytes_read'] = file_size(args.input)
+            record['rows_out'] = len(parsed_data)
+        line_count = parse_stats.get('total_records', 1) - 1  # the skipped header
+        if not line_count:
+            print("Error: No data found.")
+            return None, None
+        print(f"✓ Read {line_count} transactions and parsed {len(parsed_data)} records\n")
+        return parsed_data, parse_stats
+
+    if args.workers > 1:
+        print(f"[2/10] Parsing and cleaning data on {args.workers} processes...")
+        with metrics.stage('parse') as record:
+            parsed_data = parallel_parse(args.input, args.workers, parse_stats)
+            record['bytes_read'] = sum(info['bytes'] for info in parse_stats['sources'])
+            record['rows_out'] = len(parsed_data)
+        line_count = sum(info['records'] for info in parse_stats['sources'])
+        if not line_count:
+            print("Error: No data found.")
+            return None, None
+        print(f"✓ Read {line_count} transactions and parsed {len(parsed_data)} records\n")
+        return parsed_data, parse_stats
+
+    with metrics.stage('read') as record:
+        sources = read_sales_sources(args.input)
+        record['bytes_read'] = sum(info['bytes'] for info, _ in sources)
+        record['rows_out'] = line_count = sum(len(lines) for _, lines in sources)
+    if not line_count:
+        print("Error: No data found.")
+        return None, None
+    files = f" from {len(sources)} files" if len(sources) > 1 else ""
+    print(f"✓ Successfully read {line_count} transactions{files}\n")
+
+    # 3. Parse and clean transactions
+    print("[2/10] Parsing and cleaning data...")
+    with metrics.stage('parse', rows_in=line_count) as record:
+        # The numpy backend works on encoded columns, so parse straight into them
+        parsed_data = parse_sources(sources, parse_stats, columnar=args.backend == 'numpy')
+        record['rows_out'] = len(parsed_data)
+    print(f"✓ Parsed {len(parsed_data)} records\n")
+    return parsed_data, parse_stats
+
+def run_incremental(args):
+    """--incremental: folds the appended rows into the checkpoint and rewrites the report"""
+    print("[1/2] Fetching product data from API...")
+    api_products, messages = start_product_fetch().result()
+    for message in messages:
+        print(message)
+    print(f"✓ Fetched {len(api_products)} products\n")
+
+    print("[2/2] Updating the report from the checkpoint...")
+    try:
+        state = incremental_report(args.input, create_product_mapping(api_products), args.report,
+                                   args.checkpoint, args.sections, args.report_format)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+    stats = state['stats']
+    print(f"✓ {stats['final_count']} valid transactions of {stats['total_records'] - 1} records")
+    print(f"✓ Report saved to {args.report}")
+    return 0
+
+def filter_report_file(args, name):
+    """output/sales_report.txt + 'north' -> output/sales_report_north.txt"""
+    stem, ext = os.path.splitext(os.path.basename(args.report))
+    directory = args.report_dir or os.path.dirname(args.report)
+    return os.path.join(directory, f"{stem}_{name}{ext}")
+
+def main(argv=None):
     """Main execution function following the 13-step workflow."""
+    args = parse_args(argv)
+    if args.serve:
+        serve(args.input, args.host, args.port)
+        return 0
+    if args.incremental:
+        return run_incremental(args)
+
+    # Per-stage metrics go to --metrics-json/--metrics-prom; --profile-stage
+    # (or SALES_PROFILE_STAGE) profiles one stage into output/profiles/
+    metrics = PipelineMetrics(profile_stage=args.profile_stage, profile_mode=args.profile_mode)
     try:
         # 1. Print welcome message
         print("===========================================")
         print("          SALES ANALYTICS SYSTEM           ")
         print("===========================================\n")
 
-        # 2. Read sales data file (handle encoding)
-        print("[1/10] Reading sales data...")
-        raw_lines = read_sales_data('data/sales_data.txt')
-        if not raw_lines:
-            print("Error: No data found.")
-            return
-        print(f"✓ Successfully read {len(raw_lines)} transactions\n")
+        # The catalog fetch runs in the background while the local steps run;
+        # it is joined at step [6/10], so the run waits for max(fetch, local work)
+        if args.enrich_mode == 'catalog':
+            catalog = start_product_fetch()
+
+        # 2. Read sales data file (handle encoding) & 3. Parse and clean transactions
+        parsed_data, parse_stats = read_and_parse(args, metrics)
+        if parsed_data is None:
+            return 1
 
-        # 3. Parse and clean transactions
-        print("[2/10] Parsing and cleaning data...")
-        parsed_data = parse_transactions(raw_lines)
-        print(f"✓ Parsed {len(parsed_data)} records\n")
+        # --enrich-mode ids: the IDs are known now; the lookup overlaps with the remaining local steps
+        if args.enrich_mode == 'ids':
+            catalog = start_product_fetch(product_ids=extract_product_ids(parsed_data))
 
         # 4. Display filter options to user
         print("[3/10] Filter Options Available:")
-        regions = sorted(list(set(t['Region'] for t in parsed_data)))
-        amounts = [t['Quantity'] * t['UnitPrice'] for t in parsed_data]
-        print(f"Regions: {', '.join(regions)}")
-        print(f"Amount Range: ₹{min(amounts):,.0f} - ₹{max(amounts):,.0f}\n")
-
-        # 5. Ask if user wants to filter and apply criteria
-        do_filter = input("Do you want to filter data? (y/n): ").strip().lower()
-        selected_region = None
-        min_amt = None
-        if do_filter == 'y':
-            selected_region = input("Enter region to filter: ").strip()
-            min_amt_input = input("Enter minimum transaction amount: ").strip()
-            min_amt = float(min_amt_input) if min_amt_input else None
+        with metrics.stage('index', rows_in=len(parsed_data)) as record:
+            filter_index = FilterIndex(parsed_data)
+            record['rows_out'] = len(filter_index.valid)
+        min_amount, max_amount = filter_index.amount_range
+        print(f"Regions: {', '.join(filter_index.regions)}")
+        print(f"Amount Range: ₹{min_amount:,.0f} - ₹{max_amount:,.0f}\n")
+
+        # 5. Ask if user wants to filter and apply criteria (command-line options in batch mode)
+        selected_region = args.region
+        min_amt = args.min_amount
+        if args.interactive:
+            do_filter = input("Do you want to filter data? (y/n): ").strip().lower()
+            if do_filter == 'y':
+                selected_region = input("Enter region to filter: ").strip()
+                min_amt_input = input("Enter minimum transaction amount: ").strip()
+                min_amt = float(min_amt_input) if min_amt_input else None
 
         # 6. Validate transactions & 7. Display validation summary
         print("\n[4/10] Validating transactions...")
-        valid_data, inv_count, summary = validate_and_filter(
-            parsed_data, region=selected_region, min_amount=min_amt
-        )
+        with metrics.stage('validate', rows_in=len(parsed_data)) as record:
+            valid_data, inv_count, summary = validate_and_filter(
+                parsed_data, region=selected_region, min_amount=min_amt,
+                max_amount=args.max_amount, index=filter_index, stats=parse_stats
+            )
+            record['rows_out'] = len(valid_data)
         print(f"✓ Valid: {len(valid_data)} | Invalid: {inv_count}\n")
 
-        # 8. Perform all data analyses (Part 2 functions)
+        # 8. Perform all data analyses (Part 2 functions) from a single scan
         print("[5/10] Analyzing sales data...")
-        total_revenue = calculate_total_revenue(valid_data)
-        reg_analysis = region_wise_sales(valid_data)
-        top_prods = top_selling_products(valid_data)
-        cust_stats = customer_analysis(valid_data)
+        # (the report builds its customer and daily sections from the same aggregates)
+        with metrics.stage('analyze', rows_in=len(valid_data)) as record:
+            aggregates = aggregate_transactions(valid_data)
+            total_revenue = calculate_total_revenue(valid_data, aggregates)
+            reg_analysis = region_wise_sales(valid_data, aggregates)
+            top_prods = top_selling_products(valid_data, aggregates=aggregates)
+            record['rows_out'] = aggregates['transaction_count']
+
+        # Extra filter specs: one scan over the clean rows for all of them
+        filter_results = []
+        if args.filters:
+            with metrics.stage('filters', rows_in=len(filter_index.valid)) as record:
+                filter_results = aggregate_filters(filter_index.select(filter_index.valid), args.filters)
+                record['rows_out'] = sum(aggs['transaction_count'] for aggs, _ in filter_results)
+            for spec, (aggs, _) in zip(args.filters, filter_results):
+                print(f"Filter '{spec['name']}': {aggs['transaction_count']} transactions")
         print("✓ Analysis complete\n")
 
         # 9. Fetch products from API
         print("[6/10] Fetching product data from API...")
-        api_products = fetch_all_products()
+        with metrics.stage('api_fetch') as record:
+            api_products, messages = catalog.result()
+            record['rows_out'] = len(api_products)
+        for message in messages:
+            print(message)
         print(f"✓ Fetched {len(api_products)} products\n")
 
         # 10. Enrich sales data with API info
         print("[7/10] Enriching sales data...")
-        prod_mapping = create_product_mapping(api_products)
-        enriched_data = enrich_sales_data(valid_data, prod_mapping)
+        with metrics.stage('enrich', rows_in=len(valid_data)) as record:
+            prod_mapping = create_product_mapping(api_products)
+            enriched_data = enrich_sales_data(valid_data, prod_mapping, save=False)
+            record['rows_out'] = len(enriched_data)
         enriched_count = sum(1 for t in enriched_data if t.get('API_Match'))
         perc = (enriched_count / len(enriched_data)) * 100 if enriched_data else 0
         print(f"✓ Enriched {enriched_count}/{len(enriched_data)} transactions ({perc:.1f}%)\n")
 
         # 11. Save enriched data to file
         print("[8/10] Saving enriched data...")
-        # (The logic to save is inside the enrich_sales_data function as per image 3.2)
-        print("✓ Saved to: data/enriched_sales_data.txt\n")
+        with metrics.stage('save', rows_in=len(enriched_data)) as record:
+            save_enriched_data(enriched_data, args.enriched_output, fmt=args.format)
+            record['bytes_written'] = file_size(args.enriched_output)
+        print(f"✓ Saved to: {args.enriched_output}\n")
 
-        # 12. Generate comprehensive report
+        # 12. Generate comprehensive report (plus one per filter spec)
         print("[9/10] Generating report...")
-        generate_sales_report(valid_data, enriched_data)
-        print("✓ Report saved to: output/sales_report.txt\n")
+        with metrics.stage('report', rows_in=len(valid_data)) as record:
+            generate_sales_report(valid_data, enriched_data, args.report, aggregates=aggregates,
+                                  sections=args.sections, fmt=args.report_format)
+            record['bytes_written'] = file_size(args.report)
+        print(f"✓ Report saved to: {args.report}")
+
+        if filter_results:
+            with metrics.stage('filter_reports', rows_in=len(filter_results)) as record:
+                written = 0
+                for spec, (aggs, product_keys) in zip(args.filters, filter_results):
+                    if not aggs['transaction_count']:
+                        print(f"  Filter '{spec['name']}': no matching transactions, no report")
+                        continue
+                    output_file = filter_report_file(args, spec['name'])
+                    generate_sales_report(
+                        [], [], output_file, aggregates=aggs,
+                        enrichment=summarize_enrichment_from_keys(product_keys, prod_mapping),
+                        sections=args.sections, fmt=args.report_format
+                    )
+                    written += 1
+                    print(f"  Filter '{spec['name']}' report saved to: {output_file}")
+                record['rows_out'] = written
+        print()
 
         # 13. Print success message with file locations
         print("[10/10] Process Complete!")
         print("===========================================")
+        return 0
 
     except Exception as e:
         # Error Handling: Wrap entire process in try-except
-        print(f"\nCRITICAL ERROR: {str(e)}")
+        stage = f" in stage '{metrics.failed_stage}'" if metrics.failed_stage else ""
+        print(f"\nCRITICAL ERROR{stage}: {str(e)}")
         print("The program encountered an issue and could not complete the process.")
+        return 1
+
+    finally:
+        try:
+            metrics.save(args.metrics_json, args.metrics_prom)
+        except OSError as e:
+            print(f"Could not write pipeline metrics: {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils.api_handler import (
+    fetch_all_products, fetch_products_by_ids, save_product_cache, load_product_cache, join_revalidations
+)
+
+PRODUCTS = [{'id': i, 'title': f"Product {i}"} for i in range(1, 6)]
+FETCH_OPTIONS = {'page_size': 2, 'max_workers': 2, 'timeout': 2, 'retries': 0, 'backoff': 0}
+
+def unused_url():
+    """A URL on a local port nothing listens on"""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}/products"
+
+class CatalogHandler(BaseHTTPRequestHandler):
+    """Paged /products (and /products/<id>) stub with an ETag; answers 304 when it matches"""
+
+    etag = '"v2"'
+    requests = []
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get('If-None-Match')))
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        if '?' not in self.path:
+            p_id = int(self.path.rsplit('/', 1)[1])
+            product = next((p for p in PRODUCTS if p['id'] == p_id), None)
+            body = json.dumps(product).encode()
+            self.send_response(200 if product else 404)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        query = dict(part.split('=') for part in self.path.split('?', 1)[1].split('&'))
+        skip, limit = int(query['skip']), int(query['limit'])
+        body = json.dumps({'products': PRODUCTS[skip:skip + limit], 'total': len(PRODUCTS)}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', self.etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class ProductCacheTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), CatalogHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/products"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_file = os.path.join(self.tmp.name, 'product_cache.json')
+        self.messages = []
+        CatalogHandler.requests = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_cache(self, age, etag='"v1"', url=None):
+        cached = [{'id': 1, 'title': 'Cached'}]
+        save_product_cache({'url': url or self.url, 'fetched_at': time.time() - age, 'etag': etag,
+                            'last_modified': None, 'products': cached}, self.cache_file)
+        return cached
+
+    def fetch(self, url=None, **options):
+        return fetch_all_products(url or self.url, self.cache_file, ttl=100, stale_ttl=100,
+                                  log=self.messages.append, **FETCH_OPTIONS, **options)
+
+    def test_fresh_cache_skips_the_network(self):
+        cached = self.write_cache(age=10)
+        self.assertEqual(self.fetch(), cached)
+        self.assertEqual(CatalogHandler.requests, [])
+
+    def test_not_modified_keeps_cached_products(self):
+        cached = self.write_cache(age=1000, etag=CatalogHandler.etag)
+        self.assertEqual(self.fetch(), cached)
+        self.assertEqual(len(CatalogHandler.requests), 1)
+        self.assertEqual(CatalogHandler.requests[0][1], CatalogHandler.etag)
+        self.assertLess(time.time() - load_product_cache(self.cache_file)['fetched_at'], 10)
+
+    def test_stale_cache_is_served_and_refreshed_in_background(self):
+        cached = self.write_cache(age=150)
+        self.assertEqual(self.fetch(), cached)
+        join_revalidations(timeout=10)
+        refreshed = load_product_cache(self.cache_file)
+        self.assertEqual(refreshed['products'], PRODUCTS)
+        self.assertEqual(refreshed['etag'], CatalogHandler.etag)
+        self.assertEqual(CatalogHandler.requests[0][1], '"v1"')
+
+    def test_expired_cache_is_refetched(self):
+        self.write_cache(age=1000)
+        self.assertEqual(self.fetch(), PRODUCTS)
+        self.assertEqual(load_product_cache(self.cache_file)['products'], PRODUCTS)
+
+    def test_offline_falls_back_to_cache(self):
+        url = unused_url()
+        cached = self.write_cache(age=1000, url=url)
+        self.assertEqual(self.fetch(url), cached)
+        self.assertTrue(any('Using cached catalog' in message for message in self.messages))
+
+    def test_offline_without_cache_returns_empty_list(self):
+        self.assertEqual(self.fetch(unused_url()), [])
+
+    def fetch_ids(self, product_ids, url=None):
+        return fetch_products_by_ids(product_ids, url or self.url, self.cache_file, ttl=100,
+                                     log=self.messages.append, max_workers=2, timeout=2,
+                                     retries=0, backoff=0)
+
+    def test_ids_are_cached_without_replacing_the_catalog(self):
+        self.assertEqual(self.fetch_ids([2, 4, 99]), [PRODUCTS[1], PRODUCTS[3]])
+        self.assertEqual(len(CatalogHandler.requests), 3)
+        cache = load_product_cache(self.cache_file)
+        self.assertFalse(cache['complete'])
+
+        # Cached IDs are not requested again; new ones are merged in
+        self.assertEqual(self.fetch_ids([4, 5]), [PRODUCTS[3], PRODUCTS[4]])
+        self.assertEqual(CatalogHandler.requests[3:], [('/products/5', None)])
+        self.assertEqual(len(load_product_cache(self.cache_file)['products']), 3)
+
+        # The partial cache is not taken for the catalog
+        self.assertEqual(self.fetch(), PRODUCTS)
+
+    def test_ids_from_fresh_catalog_skip_the_network(self):
+        cached = self.write_cache(age=10)
+        self.assertEqual(self.fetch_ids([1, 2]), cached)
+        self.assertEqual(CatalogHandler.requests, [])
+
+    def test_ids_offline_fall_back_to_cache(self):
+        url = unused_url()
+        cached = self.write_cache(age=1000, url=url)
+        self.assertEqual(self.fetch_ids([1, 2], url), cached)
+        self.assertTrue(any('Using cached entries' in message for message in self.messages))
+
+if __name__ == '__main__':
+    unittest.main()
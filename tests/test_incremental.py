@@ -0,0 +1,93 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from utils import data_processor
+from utils.file_handler import read_sales_data, parse_transactions, validate_and_filter
+from utils.data_processor import aggregate_transactions, set_distinct_mode
+from utils.incremental import incremental_report, load_checkpoint
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'sales_data.txt')
+MAPPING = {101: {'title': 'Laptop', 'category': 'laptops', 'brand': 'Generic', 'rating': 4.5}}
+
+def quiet(function, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+def report_lines(filename):
+    """Report lines without the generation timestamp"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        return [line for line in f if not line.startswith('Generated')]
+
+class IncrementalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with open(DATA_FILE, 'rb') as f:
+            self.lines = f.readlines()
+        self.source = self.path('sales.txt')
+        self.distinct = (data_processor.distinct_mode, data_processor.hll_precision)
+
+    def tearDown(self):
+        set_distinct_mode(*self.distinct)
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def write_source(self, lines, mode='wb'):
+        with open(self.source, mode) as f:
+            f.writelines(lines)
+
+    def run_report(self, checkpoint, output):
+        return quiet(incremental_report, self.source, MAPPING, self.path(output), self.path(checkpoint))
+
+    def check_append_matches_full_run(self):
+        half = len(self.lines) // 2
+        self.write_source(self.lines[:half])
+        self.run_report('checkpoint.json', 'first.txt')
+        self.write_source(self.lines[half:], mode='ab')
+        state = self.run_report('checkpoint.json', 'appended.txt')
+        self.assertEqual(load_checkpoint(self.path('checkpoint.json'))['offset'], os.path.getsize(self.source))
+
+        full_state = self.run_report('fresh_checkpoint.json', 'full.txt')
+        self.assertEqual(report_lines(self.path('appended.txt')), report_lines(self.path('full.txt')))
+        self.assertEqual(state['stats'], full_state['stats'])
+        return state
+
+    def test_appended_rows_match_a_full_run(self):
+        state = self.check_append_matches_full_run()
+
+        # Same accumulators as the regular read/parse/validate/aggregate path
+        parsed = quiet(parse_transactions, quiet(read_sales_data, self.source))
+        valid = quiet(validate_and_filter, parsed)[0]
+        expected = aggregate_transactions(valid)
+        aggregates = state['aggregates']
+        self.assertEqual(aggregates['transaction_count'], expected['transaction_count'])
+        self.assertAlmostEqual(aggregates['total_revenue'], expected['total_revenue'])
+        self.assertEqual(list(aggregates['days']), list(expected['days']))
+        self.assertEqual({cid: c['products'] for cid, c in aggregates['customers'].items()},
+                         {cid: c['products'] for cid, c in expected['customers'].items()})
+
+    def test_hll_sketches_survive_the_checkpoint(self):
+        set_distinct_mode('hll', 10)
+        self.check_append_matches_full_run()
+
+    def test_checkpoint_is_json(self):
+        self.write_source(self.lines)
+        self.run_report('checkpoint.json', 'report.txt')
+        with open(self.path('checkpoint.json'), 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['offset'], os.path.getsize(self.source))
+
+    def test_unreadable_checkpoint_triggers_full_run(self):
+        self.write_source(self.lines)
+        with open(self.path('checkpoint.json'), 'wb') as f:
+            f.write(b'\x80\x04not json')
+        self.assertIsNone(load_checkpoint(self.path('checkpoint.json')))
+        state = self.run_report('checkpoint.json', 'report.txt')
+        self.assertEqual(state['stats']['total_records'], len([l for l in self.lines if l.strip()]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import contextlib
+import io
+import math
+import os
+import random
+import tempfile
+import unittest
+from utils.file_handler import read_sales_data, parse_transactions, validate_and_filter, read_sales_sources, parse_sources
+from utils.data_processor import aggregate_transactions, region_wise_sales
+from utils.parallel import parallel_aggregate, parallel_parse
+from utils.report_generator import generate_sales_report
+
+HEADER = "TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region\n"
+ROWS = 40000
+
+def write_sales_file(filename, rows=ROWS, seed=7):
+    """Pipe-delimited rows with 2-decimal prices (plus a few invalid ones)"""
+    rng = random.Random(seed)
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(HEADER)
+        for i in range(rows):
+            qty = rng.randint(0, 9) if i % 97 == 0 else rng.randint(1, 9)  # some zero quantities
+            price = rng.randint(100, 9999999) / 100
+            f.write(f"T{i:06d}|2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}|P{rng.randint(100, 140)}|"
+                    f"Product {rng.randint(1, 40)}|{qty}|{price}|C{rng.randint(1, 500):03d}|"
+                    f"{rng.choice(['North', 'South', 'East', 'West'])}\n")
+
+def quiet(function, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+class ParallelAggregateTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.filename = os.path.join(cls.tmp.name, 'sales.txt')
+        write_sales_file(cls.filename)
+        transactions = quiet(parse_transactions, read_sales_data(cls.filename))
+        cls.valid = quiet(validate_and_filter, transactions)[0]
+        cls.serial = aggregate_transactions(cls.valid)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_worker_count_does_not_change_results(self):
+        one = quiet(parallel_aggregate, self.filename, workers=1)
+        for workers, chunks in ((2, 4), (4, 4), (3, 7)):
+            other = quiet(parallel_aggregate, self.filename, workers=workers, chunks_per_worker=chunks)
+            self.assertEqual(one, other)
+
+    def test_sums_are_correctly_rounded(self):
+        aggregates, stats = quiet(parallel_aggregate, self.filename, workers=4)
+        revenues = [t['Quantity'] * t['UnitPrice'] for t in self.valid]
+        self.assertEqual(aggregates['total_revenue'], math.fsum(revenues))
+        for region, data in aggregates['regions'].items():
+            expected = math.fsum(t['Quantity'] * t['UnitPrice'] for t in self.valid if t['Region'] == region)
+            self.assertEqual(data['total_sales'], expected)
+        self.assertEqual(stats['final_count'], len(self.valid))
+
+    def test_matches_serial_output(self):
+        aggregates, _ = quiet(parallel_aggregate, self.filename, workers=4)
+        self.assertEqual(aggregates['transaction_count'], self.serial['transaction_count'])
+        self.assertEqual(list(aggregates['regions']), list(self.serial['regions']))
+        self.assertEqual(list(aggregates['days']), list(self.serial['days']))
+        self.assertAlmostEqual(aggregates['total_revenue'], self.serial['total_revenue'], delta=1e-4)
+        self.assertEqual(region_wise_sales(None, aggregates).keys(), region_wise_sales(None, self.serial).keys())
+        for region, data in region_wise_sales(None, aggregates).items():
+            expected = region_wise_sales(None, self.serial)[region]
+            self.assertEqual(data['transaction_count'], expected['transaction_count'])
+            self.assertEqual(data['percentage'], expected['percentage'])
+            self.assertAlmostEqual(data['total_sales'], expected['total_sales'], delta=1e-4)
+        for name, (qty, rev) in aggregates['products'].items():
+            self.assertEqual(qty, self.serial['products'][name][0])
+            self.assertAlmostEqual(rev, self.serial['products'][name][1], delta=1e-4)
+        for cid, data in aggregates['customers'].items():
+            self.assertEqual(data['products'], self.serial['customers'][cid]['products'])
+        for d, data in aggregates['days'].items():
+            self.assertEqual(data['customers'], self.serial['days'][d]['customers'])
+
+        # The formatted report (2 decimals) is the same either way
+        reports = []
+        enrichment = {'matched': 0, 'total': 1, 'failed_products': []}
+        for name, aggs in (('serial', self.serial), ('parallel', aggregates)):
+            output_file = os.path.join(self.tmp.name, f"{name}.txt")
+            generate_sales_report([], [], output_file, aggregates=aggs, enrichment=enrichment)
+            with open(output_file, encoding='utf-8') as f:
+                reports.append([line for line in f if not line.startswith('Generated')])
+        self.assertEqual(reports[0], reports[1])
+
+class ParallelParseTest(unittest.TestCase):
+
+    def test_matches_serial_parse(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'sales.txt')
+            write_sales_file(filename, rows=5000)
+            serial_stats, parallel_stats = {}, {}
+            serial = quiet(parse_sources, read_sales_sources(filename), serial_stats, columnar=True)
+            parallel = quiet(parallel_parse, filename, workers=3, stats=parallel_stats)
+        self.assertEqual(list(parallel), list(serial))
+        for key in ('total_records', 'invalid_removed', 'valid'):
+            self.assertEqual(parallel_stats[key], serial_stats[key])
+        self.assertEqual(parallel_stats['sources'][0]['rows'], serial_stats['sources'][0]['rows'])
+
+if __name__ == '__main__':
+    unittest.main()
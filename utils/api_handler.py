@@ -1,42 +1,352 @@
+import atexit
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
 
-def fetch_all_products():
+API_URL = "https://dummyjson.com/products"
+
+# Pagination
+# The first page (limit=PAGE_SIZE) reports 'total'; the remaining pages are
+# fetched concurrently over one pooled session, at most MAX_WORKERS at a time.
+PAGE_SIZE = 100 # Requirement: use limit=100
+MAX_WORKERS = 8
+PAGE_TIMEOUT = 10  # seconds, per request
+RETRIES = 3
+BACKOFF = 0.5      # seconds, doubled after every failed attempt
+
+# Local catalog cache
+# A fresh cache (younger than CACHE_TTL) is used without any network call.
+# A stale cache is revalidated with If-None-Match/If-Modified-Since; within
+# CACHE_STALE_TTL it is served immediately while revalidation runs in the
+# background. If the API is unreachable the cached catalog is used instead.
+CACHE_FILE = 'data/product_cache.json'
+CACHE_TTL = 24 * 60 * 60          # seconds
+CACHE_STALE_TTL = 7 * 24 * 60 * 60  # seconds after CACHE_TTL
+# Background revalidations run on daemon threads (they must not keep a
+# service from stopping); at interpreter exit a run waits up to this long
+# for them to finish writing the refreshed cache
+REVALIDATE_JOIN_TIMEOUT = 10  # seconds
+_revalidations = []
+
+def load_product_cache(cache_file=CACHE_FILE):
+    """
+    Loads the cached catalog
+    Returns: cache dictionary, or None if missing/unreadable
+    """
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        return cache if isinstance(cache.get('products'), list) else None
+    except (OSError, ValueError):
+        return None
+
+def save_product_cache(cache, cache_file=CACHE_FILE):
+    """Writes the catalog cache atomically (temp file + rename)"""
+    directory = os.path.dirname(cache_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(tmp_file, cache_file)
+
+def create_session(pool_size=MAX_WORKERS):
+    """Creates a requests session whose connection pool fits pool_size workers"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def get_with_retries(session, url, params=None, headers=None, timeout=PAGE_TIMEOUT,
+                     retries=RETRIES, backoff=BACKOFF):
+    """
+    GET with retries and exponential backoff
+    Retries connection errors, timeouts, 429 and 5xx responses
+    Raises: requests.exceptions.RequestException after the last attempt
+    """
+    for attempt in range(retries + 1):
+        try:
+            response = session.get(url, params=params, headers=headers, timeout=timeout)
+            if response.status_code != 429 and response.status_code < 500:
+                return response
+            if attempt == retries:
+                response.raise_for_status()
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt == retries:
+                raise
+        time.sleep(backoff * (2 ** attempt))
+
+def fetch_catalog(url=API_URL, headers=None, page_size=PAGE_SIZE, max_workers=MAX_WORKERS,
+                  timeout=PAGE_TIMEOUT, retries=RETRIES, backoff=BACKOFF, session=None):
+    """
+    Fetches every catalog page (skip/limit) with bounded concurrency
+    headers are sent with the first page only (conditional request)
+    Returns: (list of products in page order, first page response)
+             products is None if the first page answered 304 Not Modified
+    """
+    session = session or create_session(max_workers)
+
+    first = get_with_retries(session, url, {'limit': page_size, 'skip': 0}, headers, timeout, retries, backoff)
+    if first.status_code == 304:
+        return None, first
+    first.raise_for_status()
+
+    data = first.json()
+    products = data.get('products', [])
+    total = data.get('total', len(products))
+    if not products:
+        return products, first
+
+    def fetch_page(skip):
+        response = get_with_retries(session, url, {'limit': page_size, 'skip': skip}, None, timeout, retries, backoff)
+        response.raise_for_status()
+        return response.json().get('products', [])
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # map() keeps page order
+        for page in executor.map(fetch_page, range(len(products), total, page_size)):
+            products.extend(page)
+
+    return products, first
+
+def revalidate_product_cache(url=API_URL, cache_file=CACHE_FILE, cache=None, **fetch_options):
+    """
+    Refreshes the cache from the API using a conditional request
+    fetch_options are passed to fetch_catalog (page_size, max_workers, ...)
+    Returns: list of products (cached ones on 304)
+    Raises: requests.exceptions.RequestException if the API fails
     """
-    Fetches all products from DummyJSON API
-    
+    headers = {}
+    if cache and cache.get('url') == url:
+        if cache.get('etag'):
+            headers['If-None-Match'] = cache['etag']
+        if cache.get('last_modified'):
+            headers['If-Modified-Since'] = cache['last_modified']
+
+    products, response = fetch_catalog(url, headers, **fetch_options)
+
+    if products is None:
+        cache['fetched_at'] = time.time()
+        save_product_cache(cache, cache_file)
+        return cache['products']
+
+    save_product_cache({
+        'url': url,
+        'fetched_at': time.time(),
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'products': products
+    }, cache_file)
+    return products
+
+def _revalidate_quietly(url, cache_file, cache, fetch_options):
+    """Background revalidation; failures keep the stale cache"""
+    try:
+        revalidate_product_cache(url, cache_file, cache, **fetch_options)
+    except (requests.exceptions.RequestException, OSError, ValueError):
+        pass
+
+def join_revalidations(timeout=REVALIDATE_JOIN_TIMEOUT):
+    """Waits up to timeout seconds (in total) for background revalidations to finish"""
+    deadline = time.monotonic() + timeout
+    while _revalidations:
+        _revalidations.pop().join(max(0, deadline - time.monotonic()))
+
+# Daemon threads are still running when atexit handlers are called
+atexit.register(join_revalidations)
+
+def fetch_all_products(url=API_URL, cache_file=CACHE_FILE, ttl=CACHE_TTL,
+                       stale_ttl=CACHE_STALE_TTL, use_cache=True, log=print, product_ids=None,
+                       **fetch_options):
+    """
+    Fetches all products from DummyJSON API, following pagination
+    Uses the local catalog cache when use_cache=True (see CACHE_TTL)
+    fetch_options are passed to fetch_catalog (page_size, max_workers, ...)
+    log receives the status messages (default: print)
+    product_ids: only fetch these IDs instead (see fetch_products_by_ids;
+                 fetch_options then exclude page_size)
+
     Returns: list of product dictionaries
     """
-    url = "https://dummyjson.com/products?limit=100" # Requirement: use limit=100
-    
+    if product_ids is not None:
+        return fetch_products_by_ids(product_ids, url, cache_file, ttl, use_cache, log, **fetch_options)
+
+    cache = load_product_cache(cache_file) if use_cache else None
+    # A cache written by fetch_products_by_ids only holds some products
+    if cache is not None and cache.get('url') == url and cache.get('complete', True):
+        age = time.time() - cache.get('fetched_at', 0)
+
+        # Fresh: no network round trip
+        if age < ttl:
+            log(f"Loaded {len(cache['products'])} products from cache.")
+            return cache['products']
+
+        # Stale but usable: serve now, revalidate in the background
+        if age < ttl + stale_ttl:
+            thread = threading.Thread(target=_revalidate_quietly, args=(url, cache_file, cache, fetch_options),
+                                      daemon=True)
+            thread.start()
+            _revalidations[:] = [t for t in _revalidations if t.is_alive()] + [thread]
+            log(f"Loaded {len(cache['products'])} products from cache (refreshing in background).")
+            return cache['products']
+
     try:
         # Requirement: Handle connection errors with try-except
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        
+        if use_cache:
+            products = revalidate_product_cache(url, cache_file, cache, **fetch_options)
+        else:
+            products, _ = fetch_catalog(url, **fetch_options)
+
         # Requirement: Print status message (success)
-        print("Successfully fetched products from API.")
-        
-        return data.get('products', [])
-        
+        log("Successfully fetched products from API.")
+
+        return products
+
     except requests.exceptions.RequestException as e:
         # Requirement: Print status message (failure)
-        print(f"Failed to fetch products: {e}")
-        
+        log(f"Failed to fetch products: {e}")
+
+        # Offline fallback: any cached catalog beats no enrichment at all
+        if cache is not None and cache.get('url') == url:
+            log(f"Using cached catalog ({len(cache['products'])} products).")
+            return cache['products']
+
         # Requirement: Return empty list if API fails
         return []
 
-def create_product_mapping(api_products):
+def start_product_fetch(**options):
+    """
+    Starts fetch_all_products(**options) in a background (daemon) thread so the
+    network wait overlaps with local work; join with future.result()
+    Status messages are collected instead of printed, so they can be shown
+    when the result is used
+    Returns: concurrent.futures.Future resolving to (products, messages)
+    """
+    future = Future()
+    messages = []
+
+    def run():
+        try:
+            products = fetch_all_products(log=messages.append, **options)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result((products, messages))
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+def fetch_products_by_ids(product_ids, url=API_URL, cache_file=CACHE_FILE, ttl=CACHE_TTL, use_cache=True,
+                          log=print, max_workers=MAX_WORKERS, timeout=PAGE_TIMEOUT, retries=RETRIES,
+                          backoff=BACKOFF, batch_size=100, session=None):
+    """
+    Fetches only the given product IDs from the per-product endpoint ({url}/{id})
+    IDs are deduplicated and looked up in batches with bounded concurrency
+    IDs the API does not know (404) are skipped
+    Shares the catalog cache with fetch_all_products: a fresh cache answers
+    the IDs it holds (a fresh full catalog answers all of them), fetched
+    products are merged into it, and products that fail to fetch fall back
+    to their cached entry. A cache written here only holds the fetched IDs
+    ('complete': False), so fetch_all_products does not take it for the catalog
+    log receives the status messages (default: print)
+
+    Returns: list of product dictionaries (same shape as fetch_all_products)
+    """
+    ids = sorted({int(p_id) for p_id in product_ids if p_id is not None})
+    cache = load_product_cache(cache_file) if use_cache else None
+    if cache is not None and cache.get('url') != url:
+        cache = None
+    cached = {product.get('id'): product for product in cache['products']} if cache else {}
+    fresh = cache is not None and time.time() - cache.get('fetched_at', 0) < ttl
+
+    found = {p_id: cached[p_id] for p_id in ids if fresh and p_id in cached}
+    if fresh and cache.get('complete', True):
+        missing = []  # a fresh full catalog: IDs it lacks are unknown to the API
+    else:
+        missing = [p_id for p_id in ids if p_id not in found]
+    if found:
+        log(f"Loaded {len(found)} of {len(ids)} requested products from cache.")
+    if not missing:
+        return [found[p_id] for p_id in ids if p_id in found]
+
+    session = session or create_session(max_workers)
+    fetched = {}
+    failed = []
+
+    def fetch_one(p_id):
+        try:
+            response = get_with_retries(session, f"{url.rstrip('/')}/{p_id}", None, None,
+                                        timeout, retries, backoff)
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            return response.json()
+        except (requests.exceptions.RequestException, ValueError):
+            return False
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            for p_id, product in zip(batch, executor.map(fetch_one, batch)):
+                if product is False:
+                    failed.append(p_id)
+                elif product:
+                    fetched[p_id] = product
+
+    log(f"Fetched {len(fetched)} of {len(missing)} requested products from API.")
+    if failed:
+        log(f"Failed to fetch {len(failed)} products.")
+        # Offline fallback: a cached entry of any age beats no enrichment
+        fallback = {p_id: cached[p_id] for p_id in failed if p_id in cached}
+        if fallback:
+            log(f"Using cached entries for {len(fallback)} products.")
+            found.update(fallback)
+
+    if use_cache and fetched:
+        try:
+            _merge_into_cache(cache, url, fetched, cache_file, refreshed=not failed and not fresh)
+        except OSError as e:
+            log(f"Could not update product cache: {e}")
+
+    found.update(fetched)
+    return [found[p_id] for p_id in ids if p_id in found]
+
+def _merge_into_cache(cache, url, products, cache_file, refreshed):
+    """
+    Adds products fetched by ID to the catalog cache (replacing entries with the same id)
+    A full catalog keeps its age and validators, so it is still revalidated
+    as a whole; a partial cache is renewed when refreshed (every ID refetched)
+    """
+    if cache is None:
+        cache = {'url': url, 'fetched_at': time.time(), 'etag': None, 'last_modified': None,
+                 'complete': False, 'products': []}
+    elif refreshed and not cache.get('complete', True):
+        cache['fetched_at'] = time.time()
+    merged = {product.get('id'): product for product in cache['products']}
+    merged.update(products)
+    cache['products'] = list(merged.values())
+    save_product_cache(cache, cache_file)
+
+def create_product_mapping(api_products=None, cache_file=CACHE_FILE):
     """
     Creates a mapping of product IDs to product info
-    
+
     Parameters: api_products from fetch_all_products()
+                (None loads them from the local catalog cache)
     Returns: dictionary mapping product IDs to info
     """
+    if api_products is None:
+        cache = load_product_cache(cache_file)
+        api_products = cache['products'] if cache else []
+
     # Expected Output Format: { id: {'title': ..., 'category': ...}, ... }
     product_mapping = {}
-    
+
     for product in api_products:
         p_id = product.get('id')
         product_mapping[p_id] = {
@@ -45,7 +355,5 @@ def create_product_mapping(api_products):
             'brand': product.get('brand'),
             'rating': product.get('rating')
         }
-        
-    return product_mapping
-
 
+    return product_mapping
@@ -0,0 +1,362 @@
+import hashlib
+import json
+import mmap
+import os
+from array import array
+from datetime import datetime, date
+
+# Column store for clean transactions
+# Quantity/UnitPrice live in typed arrays, Date is a day number (date ordinal)
+# and the repeating text fields are dictionary-encoded (code -> value).
+
+FIELDS = ['TransactionID', 'Date', 'ProductID', 'ProductName',
+          'Quantity', 'UnitPrice', 'CustomerID', 'Region']
+ENCODED_FIELDS = ['ProductID', 'ProductName', 'CustomerID', 'Region']
+
+# Distinct date strings -> day numbers; the bound only matters for inputs
+# full of junk dates (real data has one entry per calendar day)
+day_cache = {}
+DATE_CACHE_SIZE = 100000
+
+def date_to_day(date_str):
+    """
+    Converts a 'YYYY-MM-DD' string to a day number (date ordinal)
+    Each distinct string is parsed only once
+    Returns: int, or None if the date is malformed
+    """
+    day = day_cache.get(date_str)
+    if day is None and date_str not in day_cache:
+        try:
+            day = datetime.strptime(date_str, '%Y-%m-%d').toordinal()
+        except (ValueError, TypeError):
+            day = None
+        if len(day_cache) >= DATE_CACHE_SIZE:
+            day_cache.clear()
+        day_cache[date_str] = day
+    return day
+
+def canonical_date(date_str):
+    """
+    The 'YYYY-MM-DD' spelling of a valid date string ('2024-1-5' -> '2024-01-05')
+    strptime also accepts unpadded months and days, so one day can arrive
+    under several spellings; only those (shorter) strings need rebuilding
+    """
+    return date_str if len(date_str) == 10 else day_to_date(date_to_day(date_str))
+
+def date_sort_key(date_str):
+    """
+    Chronological sort key for date strings
+    Malformed dates (date_to_day() is None) sort after all valid ones, by their text
+    """
+    day = date_to_day(date_str)
+    return (day is None, day or 0, str(date_str))
+
+def day_to_date(day):
+    """Converts a day number back to a 'YYYY-MM-DD' string"""
+    return date.fromordinal(day).isoformat()
+
+class TransactionColumns:
+    """
+    Compact columnar container for transactions
+    Iterating or indexing yields the usual transaction dictionaries
+    """
+
+    def __init__(self, dictionaries=None):
+        self.transaction_ids = []
+        self.quantity = array('q')
+        self.unit_price = array('d')
+        self.day = array('i')
+        self.codes = {name: array('i') for name in ENCODED_FIELDS}
+
+        # Dictionaries can be shared between stores (see take())
+        if dictionaries is None:
+            dictionaries = {
+                'values': {name: [] for name in ENCODED_FIELDS},  # code -> value
+                'lookup': {name: {} for name in ENCODED_FIELDS},  # value -> code
+                'dates': {}                                       # day -> date string
+            }
+        self.dictionaries = dictionaries
+        self.values = dictionaries['values']
+        self._lookup = dictionaries['lookup']
+        self._dates = dictionaries['dates']
+
+    def encode(self, name, value):
+        """Returns the dictionary code for a field value, adding it if new"""
+        lookup = self._lookup[name]
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(self.values[name])
+            self.values[name].append(value)
+        return code
+
+    def append(self, t):
+        """
+        Appends one transaction dictionary
+        Returns: False if its date is malformed (row not stored)
+        """
+        return self.append_fields(t['TransactionID'], t['Date'], t['ProductID'], t['ProductName'],
+                                  t['Quantity'], t['UnitPrice'], t['CustomerID'], t['Region'])
+
+    def append_fields(self, tid, date_str, pid, pname, qty, price, cid, region):
+        """
+        Appends one row from its parsed fields (FIELDS order)
+        Returns: False if the date is malformed (row not stored)
+        """
+        day = day_cache.get(date_str)
+        if day is None:
+            day = date_to_day(date_str)
+            if day is None:
+                return False
+        if day not in self._dates:
+            self._dates[day] = canonical_date(date_str)
+
+        self.transaction_ids.append(tid)
+        self.quantity.append(qty)
+        self.unit_price.append(price)
+        self.day.append(day)
+
+        codes = self.codes
+        lookup = self._lookup
+        for name, value in (('ProductID', pid), ('ProductName', pname),
+                            ('CustomerID', cid), ('Region', region)):
+            code = lookup[name].get(value)
+            if code is None:
+                code = self.encode(name, value)
+            codes[name].append(code)
+        return True
+
+    def date_string(self, day):
+        """Returns the date string for a day number"""
+        return self._dates.get(day) or day_to_date(day)
+
+    def __len__(self):
+        return len(self.quantity)
+
+    def __getitem__(self, i):
+        """Dict-row view of row i"""
+        codes = self.codes
+        values = self.values
+        return {
+            'TransactionID': self.transaction_ids[i],
+            'Date': self.date_string(self.day[i]),
+            'ProductID': values['ProductID'][codes['ProductID'][i]],
+            'ProductName': values['ProductName'][codes['ProductName'][i]],
+            'Quantity': self.quantity[i],
+            'UnitPrice': self.unit_price[i],
+            'CustomerID': values['CustomerID'][codes['CustomerID'][i]],
+            'Region': values['Region'][codes['Region'][i]]
+        }
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def column(self, name):
+        """Returns a decoded column as a list (e.g. column('Region'))"""
+        if name in ENCODED_FIELDS:
+            values = self.values[name]
+            return [values[c] for c in self.codes[name]]
+        if name == 'Date':
+            return [self.date_string(d) for d in self.day]
+        if name == 'TransactionID':
+            return list(self.transaction_ids)
+        return list(self.quantity if name == 'Quantity' else self.unit_price)
+
+    def revenue(self):
+        """Returns Quantity * UnitPrice for every row"""
+        return array('d', map(lambda q, p: q * p, self.quantity, self.unit_price))
+
+    def take(self, indices):
+        """Returns a new store with the given rows, sharing the dictionaries"""
+        result = TransactionColumns(self.dictionaries)
+        tids, qty, price, day = self.transaction_ids, self.quantity, self.unit_price, self.day
+        result.transaction_ids = [tids[i] for i in indices]
+        result.quantity = array('q', [qty[i] for i in indices])
+        result.unit_price = array('d', [price[i] for i in indices])
+        result.day = array('i', [day[i] for i in indices])
+        for name in ENCODED_FIELDS:
+            codes = self.codes[name]
+            result.codes[name] = array('i', [codes[i] for i in indices])
+        return result
+
+    def extend(self, other):
+        """Appends every row of another store, re-encoding its dictionary codes"""
+        self.transaction_ids.extend(other.transaction_ids)
+        self.quantity.extend(other.quantity)
+        self.unit_price.extend(other.unit_price)
+        self.day.extend(other.day)
+        for day, date_str in other._dates.items():
+            self._dates.setdefault(day, date_str)
+        for name in ENCODED_FIELDS:
+            mapping = [self.encode(name, value) for value in other.values[name]]
+            self.codes[name].extend(array('i', map(mapping.__getitem__, other.codes[name])))
+
+    def to_rows(self):
+        """Returns the whole store as a list of transaction dictionaries"""
+        return list(self)
+
+    @classmethod
+    def from_rows(cls, transactions):
+        """Builds a store from transaction dictionaries"""
+        columns = cls()
+        for t in transactions:
+            columns.append(t)
+        return columns
+
+
+# Binary column cache
+# Layout: MAGIC, 8-byte header length, JSON header (source signature, parse
+# stats, dictionaries, section offsets), then 8-byte aligned raw sections.
+# Loading maps the file and casts memoryviews over the sections, so no
+# column is copied or parsed. Stores loaded this way are read-only.
+
+CACHE_MAGIC = b'SALESCOL1\n'
+SIGNATURE_BYTES = 64 * 1024
+
+def source_signature(filename):
+    """
+    Identifies a source file version: size, mtime and a SHA-256 over its
+    first and last SIGNATURE_BYTES
+    """
+    st = os.stat(filename)
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        digest.update(f.read(SIGNATURE_BYTES))
+        f.seek(max(0, st.st_size - SIGNATURE_BYTES))
+        digest.update(f.read())
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': digest.hexdigest()}
+
+class StringColumn:
+    """Read-only column of strings stored as one UTF-8 blob plus end offsets"""
+
+    def __init__(self, blob, ends):
+        self._blob = blob
+        self._ends = ends
+
+    def __len__(self):
+        return len(self._ends)
+
+    def __getitem__(self, i):
+        start = self._ends[i - 1] if i > 0 else 0
+        return str(self._blob[start:self._ends[i]], 'utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+def _sections(columns):
+    """Raw sections of a store: name -> (typecode, buffer)"""
+    blob = bytearray()
+    ends = array('q')
+    for tid in columns.transaction_ids:
+        blob += tid.encode('utf-8')
+        ends.append(len(blob))
+
+    sections = {
+        'quantity': ('q', columns.quantity),
+        'unit_price': ('d', columns.unit_price),
+        'day': ('i', columns.day),
+        'tid_ends': ('q', ends),
+        'tid_blob': ('B', blob)
+    }
+    for name in ENCODED_FIELDS:
+        sections[f'codes:{name}'] = ('i', columns.codes[name])
+    return sections
+
+def write_sections(filename, magic, header, sections):
+    """
+    Writes a JSON header plus 8-byte aligned raw sections (atomically)
+    sections: name -> (typecode, buffer); the layout is added to the header
+    """
+    layout = {}
+    offset = 0
+    for name, (typecode, data) in sections.items():
+        size = memoryview(data).nbytes
+        layout[name] = [offset, size, typecode]
+        offset += size + (-size % 8)
+
+    header = json.dumps(dict(header, sections=layout)).encode('utf-8')
+    header += b' ' * (-(len(magic) + 8 + len(header)) % 8)
+
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_file = f"{filename}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_file, 'wb') as f:
+            f.write(magic)
+            f.write(len(header).to_bytes(8, 'little'))
+            f.write(header)
+            for name, (typecode, data) in sections.items():
+                view = memoryview(data)
+                f.write(view)
+                f.write(b'\0' * (-view.nbytes % 8))
+        os.replace(tmp_file, filename)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+def map_sections(filename, magic):
+    """
+    Maps a file written by write_sections
+    Returns: (header, section) where section(name) is a read-only memoryview
+             cast to the section's typecode
+    Raises: OSError, or ValueError if the file is not in this layout
+    """
+    with open(filename, 'rb') as f:
+        if f.read(len(magic)) != magic:
+            raise ValueError(f"'{filename}' is not a {magic.decode().strip()} file")
+        header_len = int.from_bytes(f.read(8), 'little')
+        header = json.loads(f.read(header_len))
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    base = len(magic) + 8 + header_len
+    data = memoryview(mapped)
+
+    def section(name):
+        offset, size, typecode = header['sections'][name]
+        view = data[base + offset:base + offset + size]
+        return view if typecode == 'B' else view.cast(typecode)
+
+    return header, section
+
+def save_columns(columns, cache_file, signature, stats=None):
+    """Writes a store to a binary column cache (atomically)"""
+    write_sections(cache_file, CACHE_MAGIC, {
+        'signature': signature,
+        'rows': len(columns),
+        'stats': stats or {},
+        'values': columns.values,
+        'dates': sorted(columns._dates.items())
+    }, _sections(columns))
+
+def load_columns(cache_file, signature=None, stats=None):
+    """
+    Maps a binary column cache into a read-only TransactionColumns store
+    Returns: store, or None if the cache is missing, corrupt or was built
+             from a different source version (signature mismatch)
+    """
+    try:
+        header, section = map_sections(cache_file, CACHE_MAGIC)
+        if signature is not None and header['signature'] != signature:
+            return None
+    except (OSError, ValueError, KeyError):
+        return None
+
+    values = header['values']
+    columns = TransactionColumns({
+        'values': values,
+        'lookup': {name: {v: i for i, v in enumerate(values[name])} for name in ENCODED_FIELDS},
+        'dates': {day: text for day, text in header['dates']}
+    })
+    columns.transaction_ids = StringColumn(section('tid_blob'), section('tid_ends'))
+    columns.quantity = section('quantity')
+    columns.unit_price = section('unit_price')
+    columns.day = section('day')
+    for name in ENCODED_FIELDS:
+        columns.codes[name] = section(f'codes:{name}')
+
+    if stats is not None:
+        stats.update(header['stats'])
+    return columns
@@ -1,59 +1,378 @@
+import heapq
+from utils.columnar import TransactionColumns, date_sort_key, write_sections, map_sections
+from utils import vectorized
+from utils.sketches import SpaceSaving, CountMinSketch, HyperLogLog, DEFAULT_EPSILON, DEFAULT_PRECISION
+
+# Aggregation Engine
+# Builds every per-region, per-product, per-customer and per-day accumulator
+# in a single pass so the analysis functions and the report share one scan.
+
+# 'python' (default) or 'numpy' (vectorized, needs NumPy)
+ANALYTICS_BACKENDS = ['python', 'numpy']
+analytics_backend = 'python'
+
+def set_analytics_backend(name):
+    """Selects the backend used by aggregate_transactions"""
+    global analytics_backend
+    if name not in ANALYTICS_BACKENDS:
+        raise ValueError(f"Unknown analytics backend '{name}'. Choose from {ANALYTICS_BACKENDS}")
+    if name == 'numpy' and not vectorized.numpy_available():
+        raise ImportError("The 'numpy' analytics backend requires NumPy (python -m pip install numpy)")
+    analytics_backend = name
+
+# Distinct counting (unique customers per day)
+# 'exact' keeps a set of CustomerIDs per day; 'hll' keeps a HyperLogLog
+# sketch instead: fixed memory per day, mergeable across days, chunks and
+# workers, with a relative error of about 1.04 / sqrt(2**precision).
+DISTINCT_MODES = ['exact', 'hll']
+distinct_mode = 'exact'
+hll_precision = DEFAULT_PRECISION
+
+def set_distinct_mode(name, precision=None):
+    """Selects how unique customers per day are counted ('exact' or 'hll')"""
+    global distinct_mode, hll_precision
+    if name not in DISTINCT_MODES:
+        raise ValueError(f"Unknown distinct mode '{name}'. Choose from {DISTINCT_MODES}")
+    if precision is not None:
+        HyperLogLog(precision)  # validates the range
+        hll_precision = precision
+    distinct_mode = name
+
+def new_distinct():
+    """Creates an empty distinct counter for the current mode (set or HyperLogLog)"""
+    return set() if distinct_mode == 'exact' else HyperLogLog(hll_precision)
+
+def distinct_mode_label(aggregates):
+    """Describes how the aggregates' unique customer counts were produced"""
+    for data in aggregates['days'].values():
+        if isinstance(data['customers'], HyperLogLog):
+            return f"approximate ({data['customers'].describe()})"
+        break
+    return 'exact'
+
+def new_aggregates(keys=None):
+    """
+    Creates an empty set of accumulators
+    keys limits it to the named accumulators (the transaction count is always
+    kept); add_transaction and aggregate_columns only fill the ones present
+    """
+    aggregates = {
+        'total_revenue': 0,
+        'transaction_count': 0,
+        'regions': {},    # region -> {'total_sales', 'transaction_count'}
+        'products': {},   # product name -> [TotalQty, TotalRev]
+        'customers': {},  # customer id -> {'total_spent', 'purchase_count', 'products'}
+        'days': {}        # date -> {'revenue', 'transaction_count', 'customers'}
+    }
+    if keys is not None:
+        aggregates = {key: value for key, value in aggregates.items()
+                      if key in keys or key == 'transaction_count'}
+    return aggregates
+
+# Exact sums
+# Partial aggregates that are merged later (parallel chunks, per-file
+# workers) accumulate revenue as exact integers in units of 2**-EXACT_BITS
+# (every finite float is a whole multiple of 2**-1074). Integer sums do not
+# depend on how rows are split or in which order partials are merged, and
+# finalize_exact() rounds each sum to the nearest float once, so the result
+# is the same for any worker or chunk count. (The serial float sums add in
+# row order and can differ from it in the last bits.)
+EXACT_BITS = 1074
+
+def exact_amount(value):
+    """A float as an exact integer count of 2**-EXACT_BITS units"""
+    numerator, denominator = value.as_integer_ratio()
+    return numerator << (EXACT_BITS - denominator.bit_length() + 1)
+
+def finalize_exact(aggregates):
+    """
+    Converts the exact revenue sums of add_transaction(..., exact=True) to
+    floats, each correctly rounded (int / int true division)
+    Returns: aggregates
+    """
+    one = 1 << EXACT_BITS
+    aggregates['total_revenue'] /= one
+    for data in aggregates['regions'].values():
+        data['total_sales'] /= one
+    for data in aggregates['products'].values():
+        data[1] /= one
+    for data in aggregates['customers'].values():
+        data['total_spent'] /= one
+    for data in aggregates['days'].values():
+        data['revenue'] /= one
+    return aggregates
+
+def add_transaction(aggregates, t, exact=False):
+    """
+    Folds a single transaction into the accumulators present in aggregates
+    (all of them unless new_aggregates was given keys)
+    exact=True adds revenue as exact integers (see finalize_exact)
+    """
+    aggregates['transaction_count'] += 1
+    if len(aggregates) == 1:
+        return  # count only
+    qty = t['Quantity']
+    rev = qty * t['UnitPrice']
+    if exact:
+        rev = exact_amount(rev)
+    if 'total_revenue' in aggregates:
+        aggregates['total_revenue'] += rev
+
+    # Sums start at int 0: 0 + x is exactly x for floats, and exact sums stay integers
+    regions = aggregates.get('regions')
+    if regions is not None:
+        reg = regions.get(t['Region'])
+        if reg is None:
+            reg = regions[t['Region']] = {'total_sales': 0, 'transaction_count': 0}
+        reg['total_sales'] += rev
+        reg['transaction_count'] += 1
+
+    products = aggregates.get('products')
+    if products is not None:
+        prod = products.get(t['ProductName'])
+        if prod is None:
+            prod = products[t['ProductName']] = [0, 0]
+        prod[0] += qty
+        prod[1] += rev
+
+    customers = aggregates.get('customers')
+    if customers is not None:
+        cust = customers.get(t['CustomerID'])
+        if cust is None:
+            cust = customers[t['CustomerID']] = {'total_spent': 0, 'purchase_count': 0, 'products': set()}
+        cust['total_spent'] += rev
+        cust['purchase_count'] += 1
+        cust['products'].add(t['ProductName'])
+
+    days = aggregates.get('days')
+    if days is not None:
+        day = days.get(t['Date'])
+        if day is None:
+            day = days[t['Date']] = {'revenue': 0, 'transaction_count': 0, 'customers': new_distinct()}
+        day['revenue'] += rev
+        day['transaction_count'] += 1
+        day['customers'].add(t['CustomerID'])
+
+def aggregate_transactions(transactions, backend=None, keys=None):
+    """
+    Computes all accumulators in one scan over the transactions
+    keys: only compute these accumulators (see new_aggregates), e.g. the
+          section_inputs() of a partial report
+    backend overrides the module-wide setting ('python' or 'numpy');
+    the numpy backend is used for TransactionColumns stores with exact
+    distinct counts only (re-encoding dict rows costs more than it saves)
+    """
+    aggregates = new_aggregates(keys)
+    if len(aggregates) == 1:
+        aggregates['transaction_count'] = len(transactions)  # a row count needs no scan
+        return aggregates
+    if isinstance(transactions, TransactionColumns):
+        if (backend or analytics_backend) == 'numpy' and distinct_mode == 'exact':
+            return vectorized.aggregate_columns_numpy(transactions, aggregates)
+        return aggregate_columns(transactions, keys)
+    for t in transactions:
+        add_transaction(aggregates, t)
+    return aggregates
+
+def merge_aggregates(target, source):
+    """
+    Folds one set of accumulators into another (e.g. partials from workers)
+    Merging partials in input order keeps first-appearance ordering
+    Returns: target
+    """
+    target['total_revenue'] += source['total_revenue']
+    target['transaction_count'] += source['transaction_count']
+
+    for reg, data in source['regions'].items():
+        cur = target['regions'].get(reg)
+        if cur is None:
+            target['regions'][reg] = dict(data)
+            continue
+        cur['total_sales'] += data['total_sales']
+        cur['transaction_count'] += data['transaction_count']
+
+    for name, (qty, rev) in source['products'].items():
+        cur = target['products'].get(name)
+        if cur is None:
+            target['products'][name] = [qty, rev]
+            continue
+        cur[0] += qty
+        cur[1] += rev
+
+    for cid, data in source['customers'].items():
+        cur = target['customers'].get(cid)
+        if cur is None:
+            target['customers'][cid] = dict(data, products=set(data['products']))
+            continue
+        cur['total_spent'] += data['total_spent']
+        cur['purchase_count'] += data['purchase_count']
+        cur['products'] |= data['products']
+
+    for d, data in source['days'].items():
+        cur = target['days'].get(d)
+        if cur is None:
+            target['days'][d] = dict(data, customers=data['customers'].copy())
+            continue
+        cur['revenue'] += data['revenue']
+        cur['transaction_count'] += data['transaction_count']
+        cur['customers'] |= data['customers']
+
+    return target
+
+def aggregate_columns(columns, keys=None):
+    """
+    Columnar version of aggregate_transactions (keys as in new_aggregates)
+    Accumulates on dictionary codes and decodes once per group at the end
+    """
+    aggregates = new_aggregates(keys)
+    total = 0
+    regions, products, customers, days = {}, {}, {}, {}
+    want_regions, want_products = 'regions' in aggregates, 'products' in aggregates
+    want_customers, want_days = 'customers' in aggregates, 'days' in aggregates
+    region_codes = columns.codes['Region']
+    product_codes = columns.codes['ProductName']
+    customer_codes = columns.codes['CustomerID']
+    customer_ids = columns.values['CustomerID']
+    exact = distinct_mode == 'exact'  # exact: sets of codes, decoded at the end
+
+    for i, (qty, price, day) in enumerate(zip(columns.quantity, columns.unit_price, columns.day)):
+        rev = qty * price
+        total += rev
+
+        if want_regions:
+            reg = regions.get(region_codes[i])
+            if reg is None:
+                reg = regions[region_codes[i]] = [0.0, 0]
+            reg[0] += rev
+            reg[1] += 1
+
+        if want_products:
+            prod = products.get(product_codes[i])
+            if prod is None:
+                prod = products[product_codes[i]] = [0, 0.0]
+            prod[0] += qty
+            prod[1] += rev
+
+        if want_customers:
+            cust = customers.get(customer_codes[i])
+            if cust is None:
+                cust = customers[customer_codes[i]] = [0.0, 0, set()]
+            cust[0] += rev
+            cust[1] += 1
+            cust[2].add(product_codes[i])
+
+        if want_days:
+            d = days.get(day)
+            if d is None:
+                d = days[day] = [0.0, 0, set() if exact else new_distinct()]
+            d[0] += rev
+            d[1] += 1
+            d[2].add(customer_codes[i] if exact else customer_ids[customer_codes[i]])
+
+    # Decode group keys (insertion order = first appearance, as in add_transaction)
+    region_names = columns.values['Region']
+    product_names = columns.values['ProductName']
+    if 'total_revenue' in aggregates:
+        aggregates['total_revenue'] = total
+    aggregates['transaction_count'] = len(columns)
+    for code, (sales, count) in regions.items():
+        aggregates['regions'][region_names[code]] = {'total_sales': sales, 'transaction_count': count}
+    for code, stats in products.items():
+        aggregates['products'][product_names[code]] = stats
+    for code, (spent, count, prods) in customers.items():
+        aggregates['customers'][customer_ids[code]] = {
+            'total_spent': spent, 'purchase_count': count,
+            'products': {product_names[p] for p in prods}
+        }
+    for day, (rev, count, custs) in days.items():
+        aggregates['days'][columns.date_string(day)] = {
+            'revenue': rev, 'transaction_count': count,
+            'customers': {customer_ids[c] for c in custs} if exact else custs
+        }
+    return aggregates
+
+def aggregate_filters(transactions, specs):
+    """
+    Aggregates several filters in one scan over already validated transactions
+    specs: list of dicts with optional 'region', 'min_amount', 'max_amount'
+           (same meaning as in validate_and_filter)
+    Returns: list of (aggregates, product_keys) in spec order, where each
+             aggregates equals aggregate_transactions() over that filter's rows
+             and product_keys counts (ProductID, ProductName) pairs
+    """
+    results = [(new_aggregates(), {}) for _ in specs]
+    checks = [(spec.get('region'), spec.get('min_amount'), spec.get('max_amount'), aggs, keys)
+              for spec, (aggs, keys) in zip(specs, results)]
+
+    for t in transactions:
+        region = t['Region']
+        amount = t['Quantity'] * t['UnitPrice']
+        for want_region, min_amount, max_amount, aggs, keys in checks:
+            if want_region and region != want_region:
+                continue
+            if (min_amount is not None and amount < min_amount) or \
+               (max_amount is not None and amount > max_amount):
+                continue
+            add_transaction(aggs, t)
+            key = (t['ProductID'], t['ProductName'])
+            keys[key] = keys.get(key, 0) + 1
+    return results
+
 #Task 2.1
 
-def calculate_total_revenue(transactions):
+def calculate_total_revenue(transactions, aggregates=None):
     """Calculates total revenue from all transactions"""
+    if aggregates is not None:
+        return aggregates['total_revenue']
+    if isinstance(transactions, TransactionColumns):
+        return sum(q * p for q, p in zip(transactions.quantity, transactions.unit_price))
     return sum(t['Quantity'] * t['UnitPrice'] for t in transactions)
 
-def region_wise_sales(transactions):
+def region_wise_sales(transactions, aggregates=None):
     """Analyzes sales by region"""
-    total_revenue = calculate_total_revenue(transactions)
+    if aggregates is None:
+        aggregates = aggregate_transactions(transactions)
+    total_revenue = aggregates['total_revenue']
     stats = {}
     
-    for t in transactions:
-        reg = t['Region']
-        rev = t['Quantity'] * t['UnitPrice']
-        if reg not in stats:
-            stats[reg] = {'total_sales': 0.0, 'transaction_count': 0}
-        stats[reg]['total_sales'] += rev
-        stats[reg]['transaction_count'] += 1
-        
-    for reg in stats:
-        stats[reg]['percentage'] = round((stats[reg]['total_sales'] / total_revenue) * 100, 2)
+    for reg, data in aggregates['regions'].items():
+        stats[reg] = {
+            'total_sales': data['total_sales'],
+            'transaction_count': data['transaction_count'],
+            'percentage': round((data['total_sales'] / total_revenue) * 100, 2)
+        }
         
     # Sort by total_sales descending
     return dict(sorted(stats.items(), key=lambda x: x[1]['total_sales'], reverse=True))
 
-def top_selling_products(transactions, n=5):
+def top_selling_products(transactions, n=5, aggregates=None):
     """Finds top n products by total quantity sold"""
-    product_stats = {}
-    for t in transactions:
-        name = t['ProductName']
-        qty = t['Quantity']
-        rev = qty * t['UnitPrice']
-        if name not in product_stats:
-            product_stats[name] = [0, 0.0] # [TotalQty, TotalRev]
-        product_stats[name][0] += qty
-        product_stats[name][1] += rev
+    if aggregates is None:
+        aggregates = aggregate_transactions(transactions)
         
-    # Convert to list of tuples and sort
-    result = [(name, stats[0], stats[1]) for name, stats in product_stats.items()]
-    result.sort(key=lambda x: x[1], reverse=True)
-    return result[:n]
+    # Bounded heap selection: same result (and tie order) as a full sort + [:n]
+    result = ((name, stats[0], stats[1]) for name, stats in aggregates['products'].items())
+    return heapq.nlargest(n, result, key=lambda x: x[1])
 
-def customer_analysis(transactions):
-    """Updated to ensure product list is unique and sorted correctly"""
-    stats = {}
-    for t in transactions:
-        cid = t['CustomerID']
-        rev = t['Quantity'] * t['UnitPrice']
-        if cid not in stats:
-            stats[cid] = {'total_spent': 0.0, 'purchase_count': 0, 'products': set()}
-        stats[cid]['total_spent'] += rev
-        stats[cid]['purchase_count'] += 1
-        stats[cid]['products'].add(t['ProductName'])
+def top_customers(transactions, n=5, aggregates=None):
+    """Finds the top n customers by total spent: list of (customer id, stats)"""
+    if aggregates is None:
+        aggregates = aggregate_transactions(transactions)
+    return heapq.nlargest(n, aggregates['customers'].items(), key=lambda x: x[1]['total_spent'])
+
+def customer_analysis(transactions, aggregates=None, n=None):
+    """
+    Updated to ensure product list is unique and sorted correctly
+    n limits the result to the top n customers (heap selection, no full sort)
+    """
+    if aggregates is None:
+        aggregates = aggregate_transactions(transactions)
     
     # Requirement: Sort by total_spent descending
-    sorted_customers = sorted(stats.items(), key=lambda x: x[1]['total_spent'], reverse=True)
+    if n is None:
+        sorted_customers = sorted(aggregates['customers'].items(), key=lambda x: x[1]['total_spent'], reverse=True)
+    else:
+        sorted_customers = top_customers(transactions, n, aggregates)
     
     result = {}
     for cid, data in sorted_customers:
@@ -67,97 +386,332 @@ def customer_analysis(transactions):
 
 # Task 2.2
 
-def daily_sales_trend(transactions):
-    """Analyzes sales trends by date, sorted chronologically."""
+def daily_sales_trend(transactions, aggregates=None):
+    """
+    Analyzes sales trends by date, sorted chronologically.
+    With HyperLogLog counting (--distinct hll) each day also carries
+    'unique_customers_mode': 'hll', marking unique_customers as approximate
+    """
+    if aggregates is None:
+        aggregates = aggregate_transactions(transactions)
     trend = {}
-    for t in transactions:
-        d = t['Date']
-        rev = t['Quantity'] * t['UnitPrice']
-        if d not in trend:
-            trend[d] = {'revenue': 0.0, 'transaction_count': 0, 'customers': set()}
-        trend[d]['revenue'] += rev
-        trend[d]['transaction_count'] += 1
-        trend[d]['customers'].add(t['CustomerID'])
-    
-    for d in trend:
-        trend[d]['unique_customers'] = len(trend[d].pop('customers'))
+    for d, data in aggregates['days'].items():
+        trend[d] = {
+            'revenue': data['revenue'],
+            'transaction_count': data['transaction_count'],
+            'unique_customers': len(data['customers'])
+        }
+        if not isinstance(data['customers'], set):
+            trend[d]['unique_customers_mode'] = 'hll'
         
-    return dict(sorted(trend.items())) # Sort chronologically
+    return dict(sorted(trend.items(), key=lambda x: date_sort_key(x[0]))) # Sort chronologically (day numbers)
 
-def find_peak_sales_day(transactions):
+def find_peak_sales_day(transactions, aggregates=None):
     """Identifies the date with highest revenue."""
-    trend = daily_sales_trend(transactions)
+    trend = daily_sales_trend(transactions, aggregates)
     peak_date = max(trend, key=lambda x: trend[x]['revenue'])
     return (peak_date, trend[peak_date]['revenue'], trend[peak_date]['transaction_count'])
 
 # Task 2.3
 
-def low_performing_products(transactions, threshold=10):
+def low_performing_products(transactions, threshold=10, aggregates=None):
     """Identifies products with total quantity < threshold"""
-    p_stats = {}
-    for t in transactions:
-        p = t['ProductName']
-        if p not in p_stats: p_stats[p] = [0, 0.0]
-        p_stats[p][0] += t['Quantity']
-        p_stats[p][1] += (t['Quantity'] * t['UnitPrice'])
+    if aggregates is None:
+        aggregates = aggregate_transactions(transactions)
     
     # Filter by threshold and sort ascending
-    result = [(name, q, r) for name, (q, r) in p_stats.items() if q < threshold]
+    result = [(name, q, r) for name, (q, r) in aggregates['products'].items() if q < threshold]
     return sorted(result, key=lambda x: x[1])
 
+# Approximate top-N (heavy hitters)
+# Space-Saving summaries pick the top products (by quantity) and customers
+# (by total spent) in fixed memory; Count-Min sketches estimate the second
+# measure (product revenue, customer order count) for the reported items.
+# Reported values overcount by at most epsilon * stream total.
+
+def heavy_hitters(transactions, n=5, epsilon=DEFAULT_EPSILON):
+    """
+    Approximate top products and customers over a stream of transactions
+    (list, store or a generator such as stream_transactions()) in fixed memory
+    Returns: {'products': [(name, qty, revenue, qty_error)],
+              'customers': [(customer id, total_spent, purchase_count, spent_error)],
+              'epsilon': epsilon, 'sketches': {...}} - the sketches can be merged
+              with those of other chunks (see merge_heavy_hitters)
+    """
+    sketches = {
+        'product_qty': SpaceSaving(epsilon=epsilon),
+        'product_revenue': CountMinSketch(epsilon=epsilon),
+        'customer_spent': SpaceSaving(epsilon=epsilon),
+        'customer_orders': CountMinSketch(epsilon=epsilon)
+    }
+    for t in transactions:
+        rev = t['Quantity'] * t['UnitPrice']
+        sketches['product_qty'].add(t['ProductName'], t['Quantity'])
+        sketches['product_revenue'].add(t['ProductName'], rev)
+        sketches['customer_spent'].add(t['CustomerID'], rev)
+        sketches['customer_orders'].add(t['CustomerID'])
+    return heavy_hitters_result(sketches, n, epsilon)
+
+def heavy_hitters_result(sketches, n=5, epsilon=DEFAULT_EPSILON):
+    """Builds the heavy_hitters() result from its (possibly merged) sketches"""
+    return {
+        'products': [(name, qty, sketches['product_revenue'].estimate(name), error)
+                     for name, qty, error in sketches['product_qty'].top(n)],
+        'customers': [(cid, spent, int(sketches['customer_orders'].estimate(cid)), error)
+                      for cid, spent, error in sketches['customer_spent'].top(n)],
+        'epsilon': epsilon,
+        'sketches': sketches
+    }
+
+def merge_heavy_hitters(target, source, n=5):
+    """Merges the sketches of two heavy_hitters() results; returns the combined result"""
+    for name, sketch in target['sketches'].items():
+        sketch.merge(source['sketches'][name])
+    return heavy_hitters_result(target['sketches'], n, target['epsilon'])
+
 # Task 3.2
+import bz2
+import gzip
+import lzma
 import os
 import re
+from array import array
+from functools import lru_cache
+
+# Product ID resolution
+# Each distinct ProductID is parsed once (P101 -> 101); the LRU bound keeps
+# memory flat on workloads with a high SKU churn.
+PRODUCT_ID_PATTERN = re.compile(r'\d+')
+PRODUCT_ID_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=PRODUCT_ID_CACHE_SIZE)
+def resolve_product_id(product_id):
+    """Extracts the numeric product ID (P101 -> 101), or None if there is none"""
+    numeric_id_match = PRODUCT_ID_PATTERN.search(product_id)
+    return int(numeric_id_match.group()) if numeric_id_match else None
+
+def extract_product_ids(transactions):
+    """
+    Collects the distinct numeric product IDs (P101 -> 101) in the transactions
+    Returns: sorted list of ints, for api_handler.fetch_products_by_ids()
+    """
+    if isinstance(transactions, TransactionColumns):
+        product_ids = transactions.values['ProductID']
+    else:
+        product_ids = {t['ProductID'] for t in transactions}
+
+    numeric_ids = {resolve_product_id(pid) for pid in product_ids}
+    numeric_ids.discard(None)
+    return sorted(numeric_ids)
 
-def enrich_sales_data(transactions, product_mapping):
-    """Enriches transaction data with API product information"""
+def enrichment_fields(p_id, product_mapping):
+    """Returns the API columns added to a transaction for numeric product ID p_id"""
+    if p_id in product_mapping:
+        info = product_mapping[p_id]
+        return {
+            'API_Category': info['category'],
+            'API_Brand': info['brand'],
+            'API_Rating': info['rating'],
+            'API_Match': True
+        }
+    # Handle ID doesn't exist
+    return {
+        'API_Category': None,
+        'API_Brand': None,
+        'API_Rating': None,
+        'API_Match': False
+    }
+
+def enrich_sales_data(transactions, product_mapping, save=True):
+    """
+    Enriches transaction data with API product information
+    Works as a join: the API columns are computed once per distinct ProductID
+    save=False skips writing the enriched file (call save_enriched_data yourself)
+    """
     enriched_list = []
-    
-    for t in transactions:
-        # Requirement: Extract numeric ID (P101 -> 101)
-        numeric_id_match = re.search(r'\d+', t['ProductID'])
-        p_id = int(numeric_id_match.group()) if numeric_id_match else None
-        
-        # Enrichment Logic
-        if p_id in product_mapping:
-            info = product_mapping[p_id]
-            t.update({
-                'API_Category': info['category'],
-                'API_Brand': info['brand'],
-                'API_Rating': info['rating'],
-                'API_Match': True
-            })
-        else:
-            # Handle ID doesn't exist
-            t.update({
-                'API_Category': None,
-                'API_Brand': None,
-                'API_Rating': None,
-                'API_Match': False
-            })
-        enriched_list.append(t)
+
+    if isinstance(transactions, TransactionColumns):
+        # Key column: dictionary codes of ProductID
+        joined = [enrichment_fields(resolve_product_id(pid), product_mapping)
+                  for pid in transactions.values['ProductID']]
+        codes = transactions.codes['ProductID']
+        for i, t in enumerate(transactions):
+            t.update(joined[codes[i]])
+            enriched_list.append(t)
+    else:
+        joined = {}
+        for t in transactions:
+            fields = joined.get(t['ProductID'])
+            if fields is None:
+                # Requirement: Extract numeric ID (P101 -> 101)
+                fields = joined[t['ProductID']] = enrichment_fields(
+                    resolve_product_id(t['ProductID']), product_mapping)
+            t.update(fields)
+            enriched_list.append(t)
     
     # Save back to file
-    save_enriched_data(enriched_list)
+    if save:
+        save_enriched_data(enriched_list)
     return enriched_list
 
-def save_enriched_data(enriched_transactions, filename='data/enriched_sales_data.txt'):
-    """Saves enriched transactions back to file in pipe-delimited format"""
-    os.makedirs(os.path.dirname(filename), exist_ok=True)
-    
-    headers = [
-        "TransactionID", "Date", "ProductID", "ProductName", "Quantity", 
-        "UnitPrice", "CustomerID", "Region", "API_Category", "API_Brand", 
-        "API_Rating", "API_Match"
-    ]
-    
-    with open(filename, 'w', encoding='utf-8') as f:
-        # Include new columns in header
-        f.write("|".join(headers) + "\n")
-        
-        for t in enriched_transactions:
-            # Handle None values appropriately
-            row = [
-                str(t.get(h, "None")) for h in headers
-            ]
-            f.write("|".join(row) + "\n")
\ No newline at end of file
+# Enriched output
+# Rows are preformatted and written in chunks of WRITE_CHUNK_ROWS through a
+# temp file that is renamed into place, so readers never see a partial file.
+ENRICHED_HEADERS = [
+    "TransactionID", "Date", "ProductID", "ProductName", "Quantity", 
+    "UnitPrice", "CustomerID", "Region", "API_Category", "API_Brand", 
+    "API_Rating", "API_Match"
+]
+OUTPUT_FORMATS = ['text', 'gzip', 'bz2', 'xz', 'columnar']
+FORMAT_EXTENSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz', '.cols': 'columnar'}
+WRITE_CHUNK_ROWS = 10000
+WRITE_CACHE_SIZE = 100000  # distinct formatted values kept while writing
+
+def _format_rows(transactions, headers):
+    """
+    Yields one pipe-delimited line per transaction (missing fields -> 'None')
+    For ENRICHED_HEADERS the UnitPrice text and the API_* suffix are formatted
+    once per distinct value, since str(float) dominates the write time.
+    Caches are keyed on value and type: 4 == 4.0 but str() differs
+    """
+    if headers != ENRICHED_HEADERS:
+        for t in transactions:
+            yield "|".join([str(t.get(h, "None")) for h in headers])
+        return
+
+    price_text = {}
+    api_text = {}
+    for t in transactions:
+        try:
+            price = t['UnitPrice']
+            category, brand, rating, match = api = (t['API_Category'], t['API_Brand'],
+                                                    t['API_Rating'], t['API_Match'])
+            line = (f"{t['TransactionID']}|{t['Date']}|{t['ProductID']}|{t['ProductName']}|"
+                    f"{t['Quantity']}|")
+        except KeyError:
+            yield "|".join([str(t.get(h, "None")) for h in headers])
+            continue
+
+        if price.__class__ is float:
+            text = price_text.get(price)
+            if text is None:
+                if len(price_text) >= WRITE_CACHE_SIZE:
+                    price_text.clear()
+                text = price_text[price] = str(price)
+        else:
+            text = str(price)
+        key = (api, category.__class__, brand.__class__, rating.__class__, match.__class__)
+        suffix = api_text.get(key)
+        if suffix is None:
+            if len(api_text) >= WRITE_CACHE_SIZE:
+                api_text.clear()
+            suffix = api_text[key] = "|".join(map(str, api))
+        yield f"{line}{text}|{t['CustomerID']}|{t['Region']}|{suffix}"
+
+def _write_text(f, transactions, headers, chunk_rows):
+    """Writes the header and rows in large preformatted chunks"""
+    # Include new columns in header
+    f.write("|".join(headers) + "\n")
+    chunk = []
+    for line in _format_rows(transactions, headers):
+        chunk.append(line)
+        if len(chunk) >= chunk_rows:
+            f.write("\n".join(chunk) + "\n")
+            chunk = []
+    if chunk:
+        f.write("\n".join(chunk) + "\n")
+
+# Columnar enriched files use the raw-section layout of the parse cache
+# (columnar.write_sections): Quantity/UnitPrice as typed arrays when every
+# value has the expected type, every other column as int32 codes into a
+# list of distinct JSON values stored in the header. Nothing is unpickled
+# when loading, so a file from another job cannot run code.
+ENRICHED_MAGIC = b'SALESENR1\n'
+TYPED_COLUMNS = {'Quantity': ('q', int), 'UnitPrice': ('d', float)}
+
+def _write_columnar(filename, transactions, headers):
+    """Writes the rows as raw column sections (see load_enriched_columns)"""
+    sections = {}
+    typed = []
+    values = {}
+    for h in headers:
+        column = [t.get(h) for t in transactions]
+        typecode, kind = TYPED_COLUMNS.get(h, (None, None))
+        if kind is not None and all(v.__class__ is kind for v in column):
+            sections[h] = (typecode, array(typecode, column))
+            typed.append(h)
+            continue
+
+        # Dictionary encoding keyed on (type, value), so 4 and 4.0 stay distinct
+        lookup = {}
+        distinct = values[h] = []
+        codes = array('i')
+        for v in column:
+            key = (v.__class__, v)
+            code = lookup.get(key)
+            if code is None:
+                code = lookup[key] = len(distinct)
+                distinct.append(v)
+            codes.append(code)
+        sections[h] = ('i', codes)
+
+    write_sections(filename, ENRICHED_MAGIC,
+                   {'headers': headers, 'rows': len(transactions), 'typed': typed, 'values': values}, sections)
+
+def save_enriched_data(enriched_transactions, filename='data/enriched_sales_data.txt', fmt=None,
+                       chunk_rows=WRITE_CHUNK_ROWS):
+    """
+    Saves enriched transactions back to file in pipe-delimited format
+    fmt: 'text', 'gzip', 'bz2', 'xz' (compressed text) or 'columnar'
+         (binary, see load_enriched_columns); default is taken from the
+         file extension (.gz/.bz2/.xz/.cols), otherwise 'text'
+    The file is replaced atomically
+    """
+    if fmt is None:
+        fmt = FORMAT_EXTENSIONS.get(os.path.splitext(filename)[1], 'text')
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{fmt}'. Choose from {OUTPUT_FORMATS}")
+
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    headers = ENRICHED_HEADERS
+    tmp_file = f"{filename}.{os.getpid()}.tmp"
+
+    try:
+        if fmt == 'columnar':
+            _write_columnar(filename, enriched_transactions, headers)  # writes its own temp file
+            return
+        if fmt == 'text':
+            with open(tmp_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
+                _write_text(f, enriched_transactions, headers, chunk_rows)
+        else:
+            if fmt == 'gzip':
+                f = gzip.open(tmp_file, 'wt', encoding='utf-8', compresslevel=6)
+            else:
+                f = {'bz2': bz2.open, 'xz': lzma.open}[fmt](tmp_file, 'wt', encoding='utf-8')
+            with f:
+                _write_text(f, enriched_transactions, headers, chunk_rows)
+        os.replace(tmp_file, filename)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+def load_enriched_columns(filename):
+    """
+    Loads a file written with fmt='columnar'
+    Quantity/UnitPrice come back as read-only typed views of the mapped file,
+    the other columns as lists of the original values
+    Returns: {'headers': [...], 'columns': {header: values}}
+    Raises: ValueError if the file is not a columnar enriched file
+    """
+    header, section = map_sections(filename, ENRICHED_MAGIC)
+    columns = {}
+    for h in header['headers']:
+        if h in header['typed']:
+            columns[h] = section(h)
+        else:
+            distinct = header['values'][h]
+            columns[h] = [distinct[code] for code in section(h)]
+    return {'headers': header['headers'], 'columns': columns}
@@ -1,76 +1,260 @@
 # Task 1.1
+import codecs
+import glob
+import gzip
 import os
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from utils.columnar import (
+    TransactionColumns, source_signature, save_columns, load_columns, date_to_day, day_cache, canonical_date
+)
+
+ENCODINGS = ['utf-8', 'latin-1', 'cp1252']
+GZIP_MAGIC = b'\x1f\x8b'
+SOURCE_PATTERNS = ['*.txt', '*.txt.gz']  # files picked up from a directory
+READ_WORKERS = 8
+
+def is_gzip(filename):
+    """True if the file starts with the gzip magic bytes (whatever its name)"""
+    with open(filename, 'rb') as file:
+        return file.read(2) == GZIP_MAGIC
+
+def open_sales_file(filename, encoding=None):
+    """
+    Opens a sales file, decompressing gzip files as a stream
+    Returns: text file object, or a binary one when encoding is None
+    """
+    if is_gzip(filename):
+        return gzip.open(filename, 'rt', encoding=encoding) if encoding else gzip.open(filename, 'rb')
+    return open(filename, 'r', encoding=encoding) if encoding else open(filename, 'rb')
+
+def expand_sources(path):
+    """
+    Resolves an input to a sorted list of files: a file, a directory (its
+    SOURCE_PATTERNS files), a glob pattern, or a list of any of these
+    """
+    if isinstance(path, (list, tuple)):
+        return [f for p in path for f in expand_sources(p)]
+    if os.path.isdir(path):
+        return sorted({f for pattern in SOURCE_PATTERNS for f in glob.glob(os.path.join(path, pattern))})
+    if glob.has_magic(path):
+        return sorted(f for f in glob.glob(path) if os.path.isfile(f))
+    return [path]
 
 def read_sales_data(filename):
     """
     Reads sales data from file handling encoding issues
     Returns: list of raw lines (strings)
     """
-    encodings = ['utf-8', 'latin-1', 'cp1252']
+    try:
+        return read_sales_source(filename)[1]
+    except FileNotFoundError:
+        print(f"Error: The file '{filename}' was not found.")
+        return []
+
+def read_sales_source(filename):
+    """
+    Reads one (plain or gzip) file, trying ENCODINGS in order
+    Returns: (info, raw lines) where info has the source's name, encoding
+             (None if nothing decodes), compression and size in bytes
+    Raises: FileNotFoundError
+    """
+    info = {'source': filename, 'encoding': None, 'compressed': is_gzip(filename),
+            'bytes': os.path.getsize(filename)}
+    encodings = ENCODINGS
     
     for encoding in encodings:
         try:
-            with open(filename, 'r', encoding=encoding) as file:
+            with open_sales_file(filename, encoding) as file:
                 # Skip the header row
                 header = file.readline()
                 
                 # Read lines and remove empty lines
                 raw_lines = [line.strip() for line in file if line.strip()]
-                return raw_lines
+                info['encoding'] = encoding
+                return info, raw_lines
                 
-        except FileNotFoundError:
-            print(f"Error: The file '{filename}' was not found.")
-            return []
         except UnicodeDecodeError:
             continue
             
-    return []
-
-#Task 1.2
+    return info, []
 
-def parse_transactions(raw_lines):
+def read_sales_sources(path, workers=READ_WORKERS):
     """
-    Parses raw lines into clean list of dictionaries
+    Reads every file of an input (see expand_sources) concurrently; gzip
+    files are decompressed as they are read and each file detects its own
+    encoding. Missing files are reported and skipped.
+    Returns: list of (info, raw lines) in file order
     """
-    clean_transactions = []
-    total_records = len(raw_lines) + 1  # +1 to include the skipped header
-    invalid_removed = 0
+    files = expand_sources(path)
+    if not files:
+        print(f"Error: No sales files match '{path}'.")
+    found = []
+    for filename in files:
+        if os.path.isfile(filename):
+            found.append(filename)
+        else:
+            print(f"Error: The file '{filename}' was not found.")
+    if len(found) < 2:
+        return [read_sales_source(filename) for filename in found]
 
-    for line in raw_lines:
-        # Requirement: Split by pipe delimiter '|'
-        parts = line.split('|')
-        
-        # Requirement: Skip rows with incorrect number of fields
-        if len(parts) != 8:
-            invalid_removed += 1
+    # File reads and zlib decompression release the GIL, so threads overlap them
+    with ThreadPoolExecutor(max_workers=min(workers, len(found))) as executor:
+        return list(executor.map(read_sales_source, found))
+
+def detect_encoding(filename, chunk_size=1 << 20):
+    """
+    Finds the first encoding in ENCODINGS that decodes the whole file
+    Reads fixed-size chunks so memory use does not depend on file size
+    Returns: encoding name, or None if nothing fits
+    """
+    for encoding in ENCODINGS:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            with open_sales_file(filename) as file:
+                while True:
+                    chunk = file.read(chunk_size)
+                    if not chunk:
+                        break
+                    decoder.decode(chunk)
+            decoder.decode(b'', final=True)
+            return encoding
+        except UnicodeDecodeError:
             continue
-            
-        tid, date, pid, pname, qty, price, cid, region = parts
 
-        # Requirement: Handle commas within ProductName
-        pname = pname.replace(',', '') 
+    return None
+
+def iter_sales_data(filename, encoding=None):
+    """
+    Streaming version of read_sales_data
+    Yields stripped, non-empty lines one at a time (header skipped)
+    """
+    try:
+        if encoding is None:
+            encoding = detect_encoding(filename)
+        if encoding is None:
+            return
+
+        with open_sales_file(filename, encoding) as file:
+            # Skip the header row
+            file.readline()
+
+            for line in file:
+                line = line.strip()
+                if line:
+                    yield line
+
+    except FileNotFoundError:
+        print(f"Error: The file '{filename}' was not found.")
+
+#Task 1.2
+
+def parse_transaction_fields(line):
+    """
+    Fast-path parser for one raw line
+    Cheap string checks run before the numeric conversions, and commas are
+    only removed from fields that contain one
+    Returns: (TransactionID, Date, ProductID, ProductName, Quantity,
+              UnitPrice, CustomerID, Region) tuple, or None if the line is invalid
+    """
+    # Requirement: Split by pipe delimiter '|'
+    parts = line.split('|')
+    
+    # Requirement: Skip rows with incorrect number of fields
+    if len(parts) != 8:
+        return None
         
-        # Requirement: Remove commas from numeric fields
-        qty_str = qty.replace(',', '')
-        price_str = price.replace(',', '')
+    tid, date, pid, pname, qty, price, cid, region = parts
 
-        try:
-            # Requirement: Convert Quantity to int and UnitPrice to float
-            qty_val = int(qty_str)
-            price_val = float(price_str)
-
-            # REMOVE Criteria (Invalid):
-            # - Missing CustomerID or Region
-            # - Quantity <= 0 or UnitPrice <= 0
-            # - TransactionID not starting with 'T'
-            if (not cid.strip() or not region.strip() or 
-                qty_val <= 0 or price_val <= 0 or 
-                not tid.startswith('T')):
+    # REMOVE Criteria (Invalid):
+    # - TransactionID not starting with 'T'
+    # - Missing CustomerID or Region
+    if not tid.startswith('T') or not cid.strip() or not region.strip():
+        return None
+
+    # - Malformed Date (each distinct date string is parsed once, see date_to_day)
+    if day_cache.get(date) is None and date_to_day(date) is None:
+        return None
+    if len(date) != 10:
+        date = canonical_date(date)  # '2024-1-5' and '2024-01-05' are the same day
+
+    # Requirement: Remove commas from numeric fields
+    if ',' in qty:
+        qty = qty.replace(',', '')
+    if ',' in price:
+        price = price.replace(',', '')
+
+    try:
+        # Requirement: Convert Quantity to int and UnitPrice to float
+        qty_val = int(qty)
+        price_val = float(price)
+    except ValueError:
+        return None
+
+    # - Quantity <= 0 or UnitPrice <= 0
+    if qty_val <= 0 or price_val <= 0:
+        return None
+
+    # Requirement: Handle commas within ProductName
+    if ',' in pname:
+        pname = pname.replace(',', '')
+
+    return (tid, date, pid, pname, qty_val, price_val, cid, region)
+
+def parse_transaction_line(line):
+    """
+    Parses one raw line into a clean transaction dictionary
+    Returns: dictionary, or None if the line is invalid
+    """
+    fields = parse_transaction_fields(line)
+    if fields is None:
+        return None
+    tid, date, pid, pname, qty_val, price_val, cid, region = fields
+
+    # Requirement: Expected Output Format as dictionary
+    return {
+        'TransactionID': tid,
+        'Date': date,
+        'ProductID': pid,
+        'ProductName': pname,
+        'Quantity': qty_val,
+        'UnitPrice': price_val,
+        'CustomerID': cid,
+        'Region': region
+    }
+
+def print_parse_summary(stats):
+    """Prints the validation output required after parsing"""
+    print(f"Total records parsed: {stats['total_records']}")
+    print(f"Invalid records removed: {stats['invalid_removed']}")
+    print(f"Valid records after cleaning: {stats['valid']}")
+
+def _parse_lines(raw_lines, clean_transactions):
+    """
+    Parses raw lines, appending the clean ones to a list or TransactionColumns store
+    Returns: (lines read, invalid lines)
+    """
+    records = 0
+    invalid_removed = 0
+    parse_fields = parse_transaction_fields
+
+    if isinstance(clean_transactions, TransactionColumns):
+        append_fields = clean_transactions.append_fields
+        for line in raw_lines:
+            records += 1
+            fields = parse_fields(line)
+            if fields is None or not append_fields(*fields):
+                invalid_removed += 1
+    else:
+        append = clean_transactions.append
+        for line in raw_lines:
+            records += 1
+            fields = parse_fields(line)
+            if fields is None:
                 invalid_removed += 1
                 continue
-
-            # Requirement: Expected Output Format as dictionary
-            transaction = {
+            tid, date, pid, pname, qty_val, price_val, cid, region = fields
+            append({
                 'TransactionID': tid,
                 'Date': date,
                 'ProductID': pid,
@@ -79,83 +263,281 @@ def parse_transactions(raw_lines):
                 'UnitPrice': price_val,
                 'CustomerID': cid,
                 'Region': region
-            }
-            clean_transactions.append(transaction)
+            })
 
-        except ValueError:
-            invalid_removed += 1
-            continue
+    return records, invalid_removed
+
+def parse_transactions(raw_lines, stats=None, columnar=False):
+    """
+    Parses raw lines into clean list of dictionaries
+    Accepts any iterable of lines, e.g. iter_sales_data(filename)
+    columnar=True returns a TransactionColumns store instead, filled
+    straight from the parsed fields (rows with a malformed Date are then
+    counted as invalid)
+    """
+    if stats is None:
+        stats = {}
+    clean_transactions = TransactionColumns() if columnar else []
+    records, invalid_removed = _parse_lines(raw_lines, clean_transactions)
+
+    stats.update({'total_records': records + 1,  # + the skipped header
+                  'invalid_removed': invalid_removed, 'valid': len(clean_transactions)})
 
     # Validation Output Required
-    print(f"Total records parsed: {total_records}")
-    print(f"Invalid records removed: {invalid_removed}")
-    print(f"Valid records after cleaning: {len(clean_transactions)}")
+    print_parse_summary(stats)
 
     return clean_transactions
 
+def parse_sources(sources, stats=None, columnar=False):
+    """
+    Parses the (info, raw lines) pairs of read_sales_sources into one result,
+    in file order. Each info gets its own 'records', 'invalid_removed' and
+    'valid' counts plus 'rows', the (start, end) positions of its clean rows
+    in the result (used by validate_and_filter for per-source counts).
+    """
+    if stats is None:
+        stats = {}
+    clean_transactions = TransactionColumns() if columnar else []
+    total_records = 0
+    invalid_removed = 0
 
-# Task 1.3
+    for info, raw_lines in sources:
+        start = len(clean_transactions)
+        records, invalid = _parse_lines(raw_lines, clean_transactions)
+        info.update({'records': records, 'invalid_removed': invalid, 'valid': records - invalid,
+                     'rows': (start, len(clean_transactions))})
+        total_records += records + 1  # + the skipped header
+        invalid_removed += invalid
+
+    stats.update({'total_records': total_records, 'invalid_removed': invalid_removed,
+                  'valid': len(clean_transactions), 'sources': [info for info, _ in sources]})
 
-def validate_and_filter(transactions, region=None, min_amount=None, max_amount=None):
+    # Validation Output Required
+    print_parse_summary(stats)
+    if len(sources) > 1:
+        for info, _ in sources:
+            print(f"  {info['source']}: {info['records']} records, {info['invalid_removed']} invalid "
+                  f"({info['encoding']}{', gzip' if info['compressed'] else ''})")
+
+    return clean_transactions
+
+def stream_transactions(filename, batch_size=None, stats=None, encoding=None):
     """
-    Validates transactions and applies optional filters
+    Generator-based ingestion: reads, parses and cleans in one pass
+    Yields clean transactions one by one, or lists of up to batch_size
+    Only one batch is held in memory at a time
     """
-    total_input = len(transactions) + 10 # Adding back approx invalid count for summary
-    valid_after_rules = []
-    invalid_count = 0
-    
-    # 1. Validation Rules
-    for t in transactions:
-        # Rules: Qty > 0, Price > 0, TransactionID starts with 'T', 
-        # ProductID starts with 'P', CustomerID starts with 'C', all fields present
-        if (t['Quantity'] > 0 and t['UnitPrice'] > 0 and 
+    if stats is None:
+        stats = {}
+    stats.update({'total_records': 1, 'invalid_removed': 0, 'valid': 0})  # 1 = the skipped header
+    batch = []
+
+    for line in iter_sales_data(filename, encoding=encoding):
+        stats['total_records'] += 1
+        transaction = parse_transaction_line(line)
+        if transaction is None:
+            stats['invalid_removed'] += 1
+            continue
+        stats['valid'] += 1
+
+        if batch_size is None:
+            yield transaction
+            continue
+
+        batch.append(transaction)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+    # Validation Output Required
+    print_parse_summary(stats)
+
+
+def load_transactions_cached(filename, cache_file=None, stats=None):
+    """
+    Columnar parse with a binary sidecar cache (default: <filename>.colcache)
+    The cache is keyed on the source's size/mtime/hash and is rebuilt
+    automatically when the source changes; a valid cache is memory-mapped
+    instead of parsed
+    Returns: TransactionColumns store (read-only when loaded from cache)
+    """
+    if stats is None:
+        stats = {}
+    cache_file = cache_file or f"{filename}.colcache"
+
+    try:
+        signature = source_signature(filename)
+    except FileNotFoundError:
+        print(f"Error: The file '{filename}' was not found.")
+        return TransactionColumns()
+
+    columns = load_columns(cache_file, signature, stats)
+    if columns is not None:
+        print(f"Loaded {len(columns)} parsed transactions from cache.")
+        print_parse_summary(stats)
+        return columns
+
+    columns = parse_transactions(iter_sales_data(filename), stats, columnar=True)
+    try:
+        save_columns(columns, cache_file, signature, stats)
+    except OSError as e:
+        print(f"Could not write parse cache: {e}")
+    return columns
+
+# Task 1.3
+
+def is_valid_transaction(t):
+    """Checks a parsed transaction against the validation rules"""
+    # Rules: Qty > 0, Price > 0, TransactionID starts with 'T', 
+    # ProductID starts with 'P', CustomerID starts with 'C', all fields present
+    return (t['Quantity'] > 0 and t['UnitPrice'] > 0 and 
             t['TransactionID'].startswith('T') and 
             t['ProductID'].startswith('P') and 
             t['CustomerID'].startswith('C') and 
-            all(str(val).strip() for val in t.values())):
-            valid_after_rules.append(t)
+            all(str(val).strip() for val in t.values()))
+
+def validate_and_filter(transactions, region=None, min_amount=None, max_amount=None, index=None,
+                        sources=None, stats=None):
+    """
+    Validates transactions and applies optional filters
+    Accepts a list of dictionaries or a TransactionColumns store
+    and returns the filtered rows in the same form
+    index: a FilterIndex built from the same transactions; reused across
+           calls it skips the rule scan and answers filters by binary search
+    sources: the per-file infos from parse_sources for these transactions;
+             records read are then counted from the files and each info gets
+             its own 'rules_invalid' and 'final_count'
+    stats: the stats dict filled by parse_transactions/parse_sources (or
+           load_transactions_cached) for these transactions; records read are
+           then taken from it, and its 'sources' are used when sources is None
+    """
+    if sources is None and stats is not None:
+        sources = stats.get('sources')
+    columnar = isinstance(transactions, TransactionColumns)
+
+    if index is None:
+        valid_after_rules = []  # row positions that pass the rules
+        invalid_count = 0
+        
+        # 1. Validation Rules
+        for i, t in enumerate(transactions):
+            if is_valid_transaction(t):
+                valid_after_rules.append(i)
+            else:
+                invalid_count += 1
+
+        # Region and amount per row, computed once for display and filtering
+        if columnar:
+            region_of = transactions.column('Region')
+            amount_of = transactions.revenue()
         else:
-            invalid_count += 1
+            region_of = [t['Region'] for t in transactions]
+            amount_of = [t['Quantity'] * t['UnitPrice'] for t in transactions]
+
+        available_regions = sorted(list(set(region_of[i] for i in valid_after_rules)))
+        amounts = [amount_of[i] for i in valid_after_rules]
+        amount_range = (min(amounts), max(amounts))
+    else:
+        valid_after_rules = index.valid
+        invalid_count = index.invalid_count
+        available_regions = index.regions
+        amount_range = index.amount_range
 
     # 2. Display available options before filtering
-    available_regions = sorted(list(set(t['Region'] for t in valid_after_rules)))
-    amounts = [t['Quantity'] * t['UnitPrice'] for t in valid_after_rules]
-    
     print(f"Available Regions: {available_regions}")
-    print(f"Transaction Amount Range: {min(amounts)} to {max(amounts)}")
+    print(f"Transaction Amount Range: {amount_range[0]} to {amount_range[1]}")
 
     # 3. Apply Optional Filters
     filtered = valid_after_rules
     filtered_by_region = 0
     filtered_by_amount = 0
+    amount_filter = min_amount is not None or max_amount is not None
+
+    if index is not None:
+        filtered, filtered_by_region, filtered_by_amount = index.query(region, min_amount, max_amount)
+        if region:
+            print(f"Records after region filter: {len(valid_after_rules) - filtered_by_region}")
+        if amount_filter:
+            print(f"Records after amount filter: {len(filtered)}")
+    else:
+        if region:
+            initial_count = len(filtered)
+            filtered = [i for i in filtered if region_of[i] == region]
+            filtered_by_region = initial_count - len(filtered)
+            print(f"Records after region filter: {len(filtered)}")
 
-    if region:
-        initial_count = len(filtered)
-        filtered = [t for t in filtered if t['Region'] == region]
-        filtered_by_region = initial_count - len(filtered)
-        print(f"Records after region filter: {len(filtered)}")
+        if amount_filter:
+            initial_count = len(filtered)
+            filtered = [i for i in filtered if 
+                        (min_amount is None or amount_of[i] >= min_amount) and
+                        (max_amount is None or amount_of[i] <= max_amount)]
+            filtered_by_amount = initial_count - len(filtered)
+            print(f"Records after amount filter: {len(filtered)}")
 
-    if min_amount is not None or max_amount is not None:
-        initial_count = len(filtered)
-        filtered = [t for t in filtered if 
-                    (min_amount is None or (t['Quantity'] * t['UnitPrice']) >= min_amount) and
-                    (max_amount is None or (t['Quantity'] * t['UnitPrice']) <= max_amount)]
-        filtered_by_amount = initial_count - len(filtered)
-        print(f"Records after amount filter: {len(filtered)}")
+    # Records read (headers excluded): from the parse counts when known, else the rows handed in
+    if sources:
+        total_input = sum(info['records'] for info in sources)
+    elif stats:
+        total_input = stats['total_records'] - 1  # the skipped header
+    else:
+        total_input = len(transactions)
+    for info in sources or []:
+        start, end = info['rows']
+        valid_rows = bisect_left(valid_after_rules, end) - bisect_left(valid_after_rules, start)
+        info['rules_invalid'] = (end - start) - valid_rows
+        info['final_count'] = bisect_left(filtered, end) - bisect_left(filtered, start)
 
     # 4. Final Validation Output Required
     print("-" * 30)
-    print(f"Total records parsed: 80")
+    print(f"Total records parsed: {total_input}")
     print(f"Invalid records removed: {invalid_count}")
     print(f"Valid records after cleaning: {len(valid_after_rules)}")
+    if sources and len(sources) > 1:
+        for info in sources:
+            print(f"  {info['source']}: {info['valid'] - info['rules_invalid']} valid, "
+                  f"{info['final_count']} after filters")
     print("-" * 30)
 
+    if columnar:
+        filtered = transactions.take(filtered)
+    else:
+        filtered = [transactions[i] for i in filtered]
+
     summary = {
-        'total_input': 80,
+        'total_input': total_input,
         'invalid': invalid_count,
         'filtered_by_region': filtered_by_region,
         'filtered_by_amount': filtered_by_amount,
-        'final_count': len(filtered)
+        'final_count': len(filtered),
+        'sources': sources
     }
 
-    return filtered, invalid_count, summary
\ No newline at end of file
+    return filtered, invalid_count, summary
+
+def filter_date_range(transactions, start_date=None, end_date=None):
+    """
+    Keeps transactions dated within [start_date, end_date] ('YYYY-MM-DD', either optional)
+    Compares day numbers: the store's day column, or the cached day of each
+    distinct date string for dictionaries
+    Returns: filtered rows in the same form as the input
+    Raises: ValueError for a malformed start_date/end_date
+    """
+    first = last = None
+    if start_date is not None:
+        first = date_to_day(start_date)
+        if first is None:
+            raise ValueError(f"Invalid start date '{start_date}' (expected YYYY-MM-DD)")
+    if end_date is not None:
+        last = date_to_day(end_date)
+        if last is None:
+            raise ValueError(f"Invalid end date '{end_date}' (expected YYYY-MM-DD)")
+
+    def in_range(day):
+        return day is not None and (first is None or day >= first) and (last is None or day <= last)
+
+    if isinstance(transactions, TransactionColumns):
+        return transactions.take([i for i, day in enumerate(transactions.day) if in_range(day)])
+    return [t for t in transactions if in_range(date_to_day(t['Date']))]
@@ -0,0 +1,82 @@
+from bisect import bisect_left, bisect_right
+from utils.columnar import TransactionColumns
+from utils.file_handler import is_valid_transaction
+
+# Filter index
+# Built once per loaded dataset: the validation rules run a single time,
+# each region keeps its row positions sorted by amount, and a global sorted
+# amount array serves amount-only queries. A region + amount range query
+# is two binary searches plus a sort of the matches - O(matches log matches)
+# instead of a full scan.
+
+class FilterIndex:
+    """Prebuilt index for region and amount-range filters"""
+
+    def __init__(self, transactions):
+        self.transactions = transactions
+        self.input_count = len(transactions)
+
+        if isinstance(transactions, TransactionColumns):
+            region_of = transactions.column('Region')
+            amount_of = transactions.revenue()
+        else:
+            region_of = [t['Region'] for t in transactions]
+            amount_of = [t['Quantity'] * t['UnitPrice'] for t in transactions]
+
+        self.valid = [i for i, t in enumerate(transactions) if is_valid_transaction(t)]
+        self.invalid_count = self.input_count - len(self.valid)
+        self.amount_of = amount_of
+
+        postings = {}
+        for i in self.valid:
+            postings.setdefault(region_of[i], []).append(i)
+        self.region_rows = postings  # region -> positions in input order
+
+        # Positions sorted by amount (sort is stable, so ties keep input order)
+        self.by_amount = sorted(self.valid, key=amount_of.__getitem__)
+        self.amounts = [amount_of[i] for i in self.by_amount]
+        self.region_by_amount = {}
+        self.region_amounts = {}
+        for reg, rows in postings.items():
+            ordered = sorted(rows, key=amount_of.__getitem__)
+            self.region_by_amount[reg] = ordered
+            self.region_amounts[reg] = [amount_of[i] for i in ordered]
+
+    @property
+    def regions(self):
+        """Sorted list of regions among valid rows"""
+        return sorted(self.region_rows)
+
+    @property
+    def amount_range(self):
+        """(min, max) transaction amount among valid rows"""
+        return (self.amounts[0], self.amounts[-1]) if self.amounts else (None, None)
+
+    def query(self, region=None, min_amount=None, max_amount=None):
+        """
+        Returns the positions of valid rows matching the filters, in input order,
+        plus the number removed by each filter: (positions, by_region, by_amount)
+        """
+        if region:
+            base = self.region_rows.get(region, [])
+            ordered = self.region_by_amount.get(region, [])
+            amounts = self.region_amounts.get(region, [])
+        else:
+            base = self.valid
+            ordered = self.by_amount
+            amounts = self.amounts
+        by_region = len(self.valid) - len(base)
+
+        if min_amount is None and max_amount is None:
+            return list(base), by_region, 0
+
+        lo = 0 if min_amount is None else bisect_left(amounts, min_amount)
+        hi = len(amounts) if max_amount is None else bisect_right(amounts, max_amount)
+        matches = sorted(ordered[lo:hi]) if lo < hi else []
+        return matches, by_region, len(base) - len(matches)
+
+    def select(self, positions):
+        """Returns the rows at the given positions (a store for columnar input)"""
+        if isinstance(self.transactions, TransactionColumns):
+            return self.transactions.take(positions)
+        return [self.transactions[i] for i in positions]
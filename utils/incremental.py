@@ -0,0 +1,232 @@
+import copy
+import hashlib
+import json
+import os
+from utils.file_handler import detect_encoding, parse_transaction_line, is_valid_transaction, ENCODINGS
+from utils import data_processor
+from utils.data_processor import new_aggregates, add_transaction, resolve_product_id
+from utils.sketches import HyperLogLog
+from utils.report_generator import generate_sales_report
+
+# Incremental (append-only) processing
+# A checkpoint stores how far the source file has been read plus the
+# aggregate state at that point. The next run checks that the already-read
+# part is unchanged, then parses only the appended tail and folds it into
+# the stored accumulators row by row, exactly as a full run would.
+# Any other change to the file triggers a full recompute.
+# The checkpoint is plain JSON (sets as lists, HyperLogLog sketches as hex
+# registers), so loading one never executes code from the file.
+
+CHECKPOINT_FILE = 'data/sales_checkpoint.json'
+CHECKPOINT_VERSION = 3
+FINGERPRINT_BYTES = 64 * 1024
+
+def file_fingerprint(filename, offset):
+    """Hashes the first and last FINGERPRINT_BYTES of the file's first offset bytes"""
+    digest = hashlib.sha256(str(offset).encode())
+    with open(filename, 'rb') as f:
+        digest.update(f.read(min(offset, FINGERPRINT_BYTES)))
+        f.seek(max(0, offset - FINGERPRINT_BYTES))
+        digest.update(f.read(offset - f.tell()))
+    return digest.hexdigest()
+
+def new_state(filename, encoding, offset):
+    """Creates an empty checkpoint state starting after the header"""
+    return {
+        'version': CHECKPOINT_VERSION,
+        'source': os.path.abspath(filename),
+        'encoding': encoding,
+        'offset': offset,
+        'fingerprint': None,
+        'distinct': (data_processor.distinct_mode, data_processor.hll_precision),
+        'stats': {'total_records': 1, 'invalid_removed': 0, 'valid': 0,  # 1 = the header
+                  'rules_invalid': 0, 'final_count': 0},
+        'aggregates': new_aggregates(),
+        'product_keys': {}  # (ProductID, ProductName) -> count, for the enrichment summary
+    }
+
+def _encode_distinct(counter):
+    """Set -> sorted list, HyperLogLog -> {'precision', 'registers'}"""
+    if isinstance(counter, HyperLogLog):
+        return {'precision': counter.precision, 'registers': counter.registers.hex()}
+    return sorted(counter)
+
+def _decode_distinct(data):
+    if isinstance(data, dict):
+        counter = HyperLogLog(data['precision'])
+        registers = bytearray.fromhex(data['registers'])
+        if len(registers) != len(counter.registers):
+            raise ValueError("HyperLogLog registers do not match the precision")
+        counter.registers = registers
+        return counter
+    return set(data)
+
+def state_to_json(state):
+    """Converts a checkpoint state to JSON-compatible values"""
+    aggregates = dict(state['aggregates'])
+    aggregates['customers'] = {
+        cid: dict(cust, products=sorted(cust['products'])) for cid, cust in aggregates['customers'].items()
+    }
+    aggregates['days'] = {
+        date: dict(day, customers=_encode_distinct(day['customers'])) for date, day in aggregates['days'].items()
+    }
+    return dict(state, distinct=list(state['distinct']), aggregates=aggregates,
+                product_keys=[[pid, name, count] for (pid, name), count in state['product_keys'].items()])
+
+def state_from_json(data):
+    """
+    Inverse of state_to_json
+    Raises: KeyError, TypeError or ValueError if the data is malformed
+    """
+    aggregates = data['aggregates']
+    for cust in aggregates['customers'].values():
+        cust['products'] = set(cust['products'])
+    for day in aggregates['days'].values():
+        day['customers'] = _decode_distinct(day['customers'])
+    data['distinct'] = tuple(data['distinct'])
+    data['product_keys'] = {(pid, name): count for pid, name, count in data['product_keys']}
+    return data
+
+def load_checkpoint(checkpoint_file=CHECKPOINT_FILE):
+    """Loads a checkpoint state, or None if missing/unreadable/from another version"""
+    try:
+        with open(checkpoint_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or data.get('version') != CHECKPOINT_VERSION:
+            return None
+        return state_from_json(data)
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+def save_checkpoint(state, checkpoint_file=CHECKPOINT_FILE):
+    """Writes the checkpoint atomically (temp file + rename)"""
+    directory = os.path.dirname(checkpoint_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_file = f"{checkpoint_file}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state_to_json(state), f)
+    os.replace(tmp_file, checkpoint_file)
+
+def _fold_line(state, raw):
+    """Parses, validates and aggregates one raw line into the state"""
+    line = raw.decode(state['encoding']).strip()
+    if not line:
+        return
+    stats = state['stats']
+    stats['total_records'] += 1
+
+    t = parse_transaction_line(line)
+    if t is None:
+        stats['invalid_removed'] += 1
+        return
+    stats['valid'] += 1
+
+    if not is_valid_transaction(t):
+        stats['rules_invalid'] += 1
+        return
+    stats['final_count'] += 1
+
+    add_transaction(state['aggregates'], t)
+    key = (t['ProductID'], t['ProductName'])
+    state['product_keys'][key] = state['product_keys'].get(key, 0) + 1
+
+def _checkpoint_matches(state, filename):
+    """True if the file still starts with the bytes the state was built from"""
+    if state is None or state['source'] != os.path.abspath(filename):
+        return False
+    # Unique customer counters must match the current distinct mode
+    if state['distinct'] != (data_processor.distinct_mode, data_processor.hll_precision):
+        return False
+    if os.path.getsize(filename) < state['offset']:
+        return False
+    return file_fingerprint(filename, state['offset']) == state['fingerprint']
+
+def _full_state(filename):
+    """
+    Creates an empty state for reading the whole file
+    Raises: ValueError if no encoding in ENCODINGS decodes the file
+    """
+    encoding = detect_encoding(filename)
+    if encoding is None:
+        raise ValueError(f"Could not decode {filename} with any of {ENCODINGS}")
+    with open(filename, 'rb') as f:
+        f.readline()  # Skip the header row
+        return new_state(filename, encoding, f.tell())
+
+def _read_tail(state, filename):
+    """
+    Folds every complete line after the state's offset into the state
+    Returns: (bytes read, trailing partial line or None)
+    """
+    new_bytes = 0
+    with open(filename, 'rb') as f:
+        f.seek(state['offset'])
+        for raw in f:
+            if not raw.endswith(b'\n'):
+                # Trailing line still being written: counted for this run
+                # only and read again next time
+                return new_bytes, raw
+            _fold_line(state, raw)
+            new_bytes += len(raw)
+    return new_bytes, None
+
+def incremental_aggregate(filename, checkpoint_file=CHECKPOINT_FILE):
+    """
+    Aggregates a file, reading only what was appended since the last run
+    Returns: state dict with 'aggregates', 'stats' and 'product_keys'
+             (same accumulators as a full validate + aggregate run)
+    """
+    state = load_checkpoint(checkpoint_file)
+    mode = 'incremental'
+    if not _checkpoint_matches(state, filename):
+        mode = 'full'
+        state = _full_state(filename)
+
+    try:
+        new_bytes, partial = _read_tail(state, filename)
+    except UnicodeDecodeError:
+        if mode == 'full':
+            raise
+        # The new rows need a different encoding: recompute everything
+        mode = 'full'
+        state = _full_state(filename)
+        new_bytes, partial = _read_tail(state, filename)
+
+    state['offset'] += new_bytes
+    state['fingerprint'] = file_fingerprint(filename, state['offset'])
+    save_checkpoint(state, checkpoint_file)
+    print(f"{mode.capitalize()} run: read {new_bytes:,} new bytes")
+
+    if partial is not None:
+        state = copy.deepcopy(state)
+        _fold_line(state, partial)
+    return state
+
+def summarize_enrichment_from_keys(product_keys, product_mapping):
+    """Builds the report's enrichment summary from (ProductID, ProductName) counts"""
+    matched = 0
+    total = 0
+    failed = set()
+    for (pid, name), count in product_keys.items():
+        total += count
+        if resolve_product_id(pid) in product_mapping:
+            matched += count
+        else:
+            failed.add(name)
+    return {'matched': matched, 'total': total, 'failed_products': list(failed)}
+
+def incremental_report(filename, product_mapping, output_file='output/sales_report.txt',
+                       checkpoint_file=CHECKPOINT_FILE, sections=None, fmt=None):
+    """
+    Updates the checkpoint from the file's new tail and regenerates the report
+    from the merged state (sections/fmt as in generate_sales_report)
+    Returns: the state used for the report
+    """
+    state = incremental_aggregate(filename, checkpoint_file)
+    generate_sales_report(
+        [], [], output_file, aggregates=state['aggregates'],
+        enrichment=summarize_enrichment_from_keys(state['product_keys'], product_mapping),
+        sections=sections, fmt=fmt
+    )
+    return state
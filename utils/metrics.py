@@ -0,0 +1,224 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Pipeline metrics
+# Every pipeline stage runs inside PipelineMetrics.stage(); it records wall
+# and CPU time, rows in/out, bytes read/written and the stage's own peak
+# RSS, and marks the stage as failed if it raises. Results are written as JSON
+# and as a Prometheus textfile (node_exporter textfile collector format).
+# One stage at a time can additionally be profiled with cProfile ('cpu')
+# or tracemalloc ('memory'); both slow the stage down, so they are opt-in.
+
+METRICS_JSON = 'output/pipeline_metrics.json'
+METRICS_PROM = 'output/pipeline_metrics.prom'
+PROFILE_DIR = 'output/profiles'
+PROFILE_MODES = ['cpu', 'memory']
+PROFILE_TOP = 25  # lines kept in the text summaries
+
+PROM_METRICS = [
+    # (record key, metric name, help text)
+    ('wall_seconds', 'sales_pipeline_stage_wall_seconds', 'Wall-clock time per pipeline stage'),
+    ('cpu_seconds', 'sales_pipeline_stage_cpu_seconds', 'Process CPU time per pipeline stage'),
+    ('rows_in', 'sales_pipeline_stage_rows_in', 'Rows entering the stage'),
+    ('rows_out', 'sales_pipeline_stage_rows_out', 'Rows leaving the stage'),
+    ('bytes_read', 'sales_pipeline_stage_bytes_read', 'Bytes read by the stage'),
+    ('bytes_written', 'sales_pipeline_stage_bytes_written', 'Bytes written by the stage'),
+    ('peak_rss_bytes', 'sales_pipeline_stage_peak_rss_bytes', 'Peak RSS during the stage (Linux only)'),
+    ('traced_peak_bytes', 'sales_pipeline_stage_traced_peak_bytes',
+     'Peak Python allocations during the stage (memory profiling only)'),
+]
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far, in bytes (None if unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+# Per-stage peaks
+# ru_maxrss only ever grows, so it cannot tell which stage used the memory.
+# On Linux, writing 5 to /proc/self/clear_refs resets the peak (VmHWM) to the
+# current RSS; reading VmHWM at the end of a stage then gives that stage's
+# own peak. Elsewhere the per-stage peak is not recorded.
+
+def reset_peak_rss():
+    """Resets the process peak RSS to the current RSS; returns False if unsupported"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def peak_rss_since_reset():
+    """Peak RSS since the last reset_peak_rss(), in bytes (None if unavailable)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+def _atomic_write(filename, text):
+    """Writes text through a temp file + rename"""
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_file = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_file, filename)
+
+class PipelineMetrics:
+    """
+    Collects per-stage metrics for one pipeline run
+
+    Usage:
+        metrics = PipelineMetrics(profile_stage='parse')
+        with metrics.stage('parse', rows_in=len(lines)) as record:
+            data = parse_transactions(lines)
+            record['rows_out'] = len(data)
+    """
+
+    def __init__(self, profile_stage=None, profile_mode='cpu', profile_dir=PROFILE_DIR):
+        if profile_mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{profile_mode}'. Choose from {PROFILE_MODES}")
+        self.profile_stage = profile_stage
+        self.profile_mode = profile_mode
+        self.profile_dir = profile_dir
+        self.started_at = time.time()
+        self.stages = []
+        self.failed_stage = None
+        self.process_peak = 0  # resets lower ru_maxrss, so the run's peak is kept here
+
+    @contextmanager
+    def stage(self, name, rows_in=None, bytes_read=None):
+        """
+        Times one stage; the yielded record can be updated with rows_out,
+        bytes_read and bytes_written. Exceptions are recorded and re-raised.
+        """
+        record = {
+            'stage': name, 'status': 'ok',
+            'wall_seconds': None, 'cpu_seconds': None,
+            'rows_in': rows_in, 'rows_out': None,
+            'bytes_read': bytes_read, 'bytes_written': None,
+            'peak_rss_bytes': None
+        }
+        self.stages.append(record)
+
+        profiler = None
+        if name == self.profile_stage:
+            if self.profile_mode == 'cpu':
+                profiler = cProfile.Profile()
+                profiler.enable()
+            else:
+                tracemalloc.start()
+
+        self.process_peak = max(self.process_peak, peak_rss_bytes() or 0)
+        per_stage = reset_peak_rss()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        except BaseException as e:
+            record['status'] = 'failed'
+            record['error'] = f"{type(e).__name__}: {e}"
+            if self.failed_stage is None:
+                self.failed_stage = name
+            raise
+        finally:
+            record['wall_seconds'] = time.perf_counter() - wall_start
+            record['cpu_seconds'] = time.process_time() - cpu_start
+            if per_stage:
+                record['peak_rss_bytes'] = peak_rss_since_reset()
+            self.process_peak = max(self.process_peak, record['peak_rss_bytes'] or 0, peak_rss_bytes() or 0)
+            if name == self.profile_stage:
+                self._save_profile(name, record, profiler)
+
+    def _save_profile(self, name, record, profiler):
+        """Writes the profile of a stage to profile_dir"""
+        os.makedirs(self.profile_dir, exist_ok=True)
+        summary = io.StringIO()
+
+        if profiler is not None:
+            profiler.disable()
+            prof_file = os.path.join(self.profile_dir, f"{name}.prof")
+            profiler.dump_stats(prof_file)
+            pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(PROFILE_TOP)
+            record['profile'] = prof_file
+        else:
+            snapshot = tracemalloc.take_snapshot()
+            record['traced_peak_bytes'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            for stat in snapshot.statistics('lineno')[:PROFILE_TOP]:
+                summary.write(f"{stat}\n")
+
+        text_file = os.path.join(self.profile_dir, f"{name}_{self.profile_mode}.txt")
+        _atomic_write(text_file, summary.getvalue())
+        record['profile_summary'] = text_file
+
+    def to_dict(self):
+        """Run summary plus the per-stage records"""
+        return {
+            'started_at': self.started_at,
+            'status': 'failed' if self.failed_stage else 'ok',
+            'failed_stage': self.failed_stage,
+            'wall_seconds': sum(r['wall_seconds'] or 0 for r in self.stages),
+            'cpu_seconds': sum(r['cpu_seconds'] or 0 for r in self.stages),
+            'peak_rss_bytes': max(self.process_peak, peak_rss_bytes() or 0) or None,
+            'stages': self.stages
+        }
+
+    def to_prometheus(self):
+        """Prometheus text exposition format (one gauge family per metric)"""
+        lines = []
+        for key, metric, help_text in PROM_METRICS:
+            samples = [(r['stage'], r[key]) for r in self.stages if r.get(key) is not None]
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} gauge")
+            for stage, value in samples:
+                lines.append(f'{metric}{{stage="{stage}"}} {value}')
+
+        lines.append("# HELP sales_pipeline_stage_success 1 if the stage completed, 0 if it failed")
+        lines.append("# TYPE sales_pipeline_stage_success gauge")
+        for r in self.stages:
+            lines.append(f'sales_pipeline_stage_success{{stage="{r["stage"]}"}} {int(r["status"] == "ok")}')
+
+        lines.append("# HELP sales_pipeline_last_run_timestamp_seconds Start time of the last run")
+        lines.append("# TYPE sales_pipeline_last_run_timestamp_seconds gauge")
+        lines.append(f"sales_pipeline_last_run_timestamp_seconds {self.started_at}")
+        lines.append("# HELP sales_pipeline_success 1 if every stage completed")
+        lines.append("# TYPE sales_pipeline_success gauge")
+        lines.append(f"sales_pipeline_success {int(self.failed_stage is None)}")
+        return "\n".join(lines) + "\n"
+
+    def save(self, json_file=METRICS_JSON, prom_file=METRICS_PROM):
+        """Writes the JSON and/or Prometheus textfile outputs (None skips one)"""
+        if json_file:
+            _atomic_write(json_file, json.dumps(self.to_dict(), indent=2))
+        if prom_file:
+            _atomic_write(prom_file, self.to_prometheus())
+
+def file_size(filename):
+    """Size of a file in bytes, or None if it does not exist"""
+    try:
+        return os.path.getsize(filename)
+    except OSError:
+        return None
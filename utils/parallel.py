@@ -0,0 +1,346 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from utils.file_handler import (
+    detect_encoding, parse_transaction_line, is_valid_transaction, print_parse_summary,
+    expand_sources, is_gzip, iter_sales_data, read_sales_source, _parse_lines
+)
+from utils.columnar import TransactionColumns
+from utils import data_processor
+from utils.data_processor import (
+    new_aggregates, add_transaction, merge_aggregates, finalize_exact, set_distinct_mode
+)
+from utils.incremental import summarize_enrichment_from_keys
+from utils.report_generator import generate_sales_report
+
+# Multi-core ingestion
+# The file is split at line boundaries into byte ranges. Each worker parses,
+# validates, filters and partially aggregates its range; partials are merged
+# in range order, so first-appearance ordering does not depend on worker
+# scheduling. Revenue is summed exactly (see data_processor.finalize_exact),
+# so the totals do not depend on the worker or chunk count either.
+# Several input files (e.g. one per branch per day, plain or gzip) are
+# processed one file per task instead, with per-file encoding detection and
+# counts, and merged in file order the same way.
+
+def split_file_ranges(filename, parts):
+    """
+    Splits the data part of a file (after the header) into byte ranges
+    Every range starts at the beginning of a line and ends after a newline
+    Returns: list of (start, end) offsets
+    """
+    size = os.path.getsize(filename)
+    with open(filename, 'rb') as file:
+        # Skip the header row
+        file.readline()
+        start = file.tell()
+
+        step = max(1, (size - start) // max(1, parts))
+        ranges = []
+        while start < size:
+            file.seek(min(start + step, size))
+            if file.tell() < size:
+                file.readline()  # move to the next line boundary
+            end = file.tell()
+            ranges.append((start, end))
+            start = end
+
+    return ranges
+
+def new_range_stats():
+    """Creates the per-range record counters"""
+    return {
+        'total_records': 0, 'invalid_removed': 0, 'valid': 0,
+        'rules_invalid': 0, 'filtered_by_region': 0, 'filtered_by_amount': 0,
+        'final_count': 0
+    }
+
+def process_range(filename, encoding, start, end, region=None, min_amount=None, max_amount=None,
+                  distinct=None):
+    """
+    Parses, validates, filters and aggregates one byte range of the file
+    distinct: (mode, precision) for set_distinct_mode, so worker processes
+              count unique customers the same way as the parent
+    Returns: (stats, aggregates)
+    """
+    if distinct is not None:
+        set_distinct_mode(*distinct)
+    stats = new_range_stats()
+    aggregates = new_aggregates()
+
+    with open(filename, 'rb') as file:
+        file.seek(start)
+        position = start
+        while position < end:
+            raw = file.readline()
+            if not raw:
+                break
+            position += len(raw)
+
+            line = raw.decode(encoding).strip()
+            if line:
+                _process_line(line, stats, aggregates, None, region, min_amount, max_amount)
+
+    return stats, aggregates
+
+def _process_line(line, stats, aggregates, product_keys, region, min_amount, max_amount):
+    """Parses, validates, filters and aggregates one stripped line"""
+    stats['total_records'] += 1
+
+    t = parse_transaction_line(line)
+    if t is None:
+        stats['invalid_removed'] += 1
+        return
+    stats['valid'] += 1
+
+    if not is_valid_transaction(t):
+        stats['rules_invalid'] += 1
+        return
+
+    if region and t['Region'] != region:
+        stats['filtered_by_region'] += 1
+        return
+
+    if min_amount is not None or max_amount is not None:
+        amount = t['Quantity'] * t['UnitPrice']
+        if ((min_amount is not None and amount < min_amount) or
+                (max_amount is not None and amount > max_amount)):
+            stats['filtered_by_amount'] += 1
+            return
+
+    stats['final_count'] += 1
+    add_transaction(aggregates, t, exact=True)
+    if product_keys is not None:
+        key = (t['ProductID'], t['ProductName'])
+        product_keys[key] = product_keys.get(key, 0) + 1
+
+def process_file(filename, region=None, min_amount=None, max_amount=None, distinct=None):
+    """
+    Parses, validates, filters and aggregates one whole (plain or gzip) file
+    Returns: (stats, aggregates, product_keys); stats also names the file,
+             its encoding and whether it was compressed
+    """
+    if distinct is not None:
+        set_distinct_mode(*distinct)
+    stats = new_range_stats()
+    aggregates = new_aggregates()
+    product_keys = {}  # (ProductID, ProductName) -> count, for the enrichment summary
+
+    encoding = detect_encoding(filename)
+    stats.update({'source': filename, 'encoding': encoding, 'compressed': is_gzip(filename)})
+    if encoding is not None:
+        for line in iter_sales_data(filename, encoding=encoding):
+            _process_line(line, stats, aggregates, product_keys, region, min_amount, max_amount)
+
+    return stats, aggregates, product_keys
+
+def _process_file_task(args):
+    return process_file(*args)
+
+def _process_range_task(args):
+    return process_range(*args)
+
+def parallel_aggregate(filename, workers=None, region=None, min_amount=None, max_amount=None,
+                       chunks_per_worker=4):
+    """
+    Reads, cleans, validates, filters and aggregates a file on several cores
+    workers: number of processes (default: all CPUs; 1 runs in-process)
+    Returns: (aggregates, stats) - same accumulators as aggregate_transactions();
+             revenue sums are correctly rounded and identical for any worker
+             count (the serial float sums may differ in the last bits)
+    """
+    workers = workers or os.cpu_count() or 1
+    stats = new_range_stats()
+    stats['total_records'] = 1  # the skipped header, as in parse_transactions
+    aggregates = new_aggregates()
+
+    try:
+        encoding = detect_encoding(filename)
+    except FileNotFoundError:
+        print(f"Error: The file '{filename}' was not found.")
+        return aggregates, stats
+    if encoding is None:
+        return aggregates, stats
+    if is_gzip(filename):
+        # A gzip stream cannot be split at byte offsets: one task for the whole file
+        aggregates, stats, _ = parallel_aggregate_files([filename], 1, region, min_amount, max_amount)
+        return aggregates, stats
+
+    ranges = split_file_ranges(filename, workers * chunks_per_worker if workers > 1 else 1)
+    distinct = (data_processor.distinct_mode, data_processor.hll_precision)
+    tasks = [(filename, encoding, start, end, region, min_amount, max_amount, distinct)
+             for start, end in ranges]
+
+    if workers == 1:
+        results = [process_range(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map() returns results in task order, so the merge is deterministic
+            results = list(executor.map(_process_range_task, tasks))
+
+    for part_stats, part_aggregates in results:
+        for key, value in part_stats.items():
+            stats[key] += value
+        merge_aggregates(aggregates, part_aggregates)
+    finalize_exact(aggregates)
+
+    # Validation Output Required
+    print_parse_summary(stats)
+    return aggregates, stats
+
+def parallel_aggregate_files(path, workers=None, region=None, min_amount=None, max_amount=None):
+    """
+    Processes every file of an input (a file, directory, glob or list, see
+    expand_sources) on several cores, one file per task, and merges the
+    per-file aggregates in file order
+    Returns: (aggregates, stats, product_keys); stats['sources'] holds the
+             per-file counts, the other counters are totals over all files
+    """
+    files = []
+    for filename in expand_sources(path):
+        if os.path.isfile(filename):
+            files.append(filename)
+        else:
+            print(f"Error: The file '{filename}' was not found.")
+    workers = min(workers or os.cpu_count() or 1, max(1, len(files)))
+
+    distinct = (data_processor.distinct_mode, data_processor.hll_precision)
+    tasks = [(filename, region, min_amount, max_amount, distinct) for filename in files]
+    if workers == 1:
+        results = [process_file(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map() returns results in task order, so the merge is deterministic
+            results = list(executor.map(_process_file_task, tasks))
+
+    stats = new_range_stats()
+    stats['sources'] = []
+    aggregates = new_aggregates()
+    product_keys = {}
+    for file_stats, file_aggregates, file_keys in results:
+        for key in new_range_stats():
+            stats[key] += file_stats[key]
+        stats['total_records'] += 1  # the file's skipped header, as in parse_transactions
+        stats['sources'].append(file_stats)
+        merge_aggregates(aggregates, file_aggregates)
+        for key, count in file_keys.items():
+            product_keys[key] = product_keys.get(key, 0) + count
+    finalize_exact(aggregates)
+
+    # Validation Output Required
+    print_parse_summary(stats)
+    for file_stats in stats['sources'] if len(stats['sources']) > 1 else []:
+        print(f"  {file_stats['source']}: {file_stats['total_records']} records, "
+              f"{file_stats['invalid_removed'] + file_stats['rules_invalid']} invalid, "
+              f"{file_stats['final_count']} kept ({file_stats['encoding']}"
+              f"{', gzip' if file_stats['compressed'] else ''})")
+    return aggregates, stats, product_keys
+
+# Parallel parsing (main.py --workers)
+# Workers parse byte ranges of one plain file, or one file per task for a
+# multi-file or gzip input, into TransactionColumns stores (compact arrays,
+# cheap to send back). The parent appends them in input order, which gives
+# the same store as a serial parse_sources(..., columnar=True), so the rest
+# of the pipeline runs on it unchanged and nothing is parsed twice.
+
+def parse_range(filename, encoding, start, end):
+    """
+    Parses one byte range of a plain file into a TransactionColumns store
+    Returns: (lines read, invalid lines, store)
+    """
+    with open(filename, 'rb') as file:
+        file.seek(start)
+        text = file.read(end - start).decode(encoding)
+    lines = (line.strip() for line in io.StringIO(text, newline=None))
+    columns = TransactionColumns()
+    records, invalid = _parse_lines((line for line in lines if line), columns)
+    return records, invalid, columns
+
+def parse_file(filename):
+    """
+    Reads and parses one whole (plain or gzip) file
+    Returns: (info as in read_sales_source, lines read, invalid lines, store)
+    """
+    info, lines = read_sales_source(filename)
+    columns = TransactionColumns()
+    records, invalid = _parse_lines(lines, columns)
+    return info, records, invalid, columns
+
+def _parse_range_task(args):
+    return parse_range(*args)
+
+def _parse_file_task(filename):
+    return parse_file(filename)
+
+def parallel_parse(path, workers=None, stats=None, chunks_per_worker=4):
+    """
+    Reads and parses an input (file, directory, glob or list) on several cores
+    stats is filled like parse_sources' (totals plus per-file 'sources' infos)
+    Returns: TransactionColumns store with the clean rows in input order
+    """
+    if stats is None:
+        stats = {}
+    workers = workers or os.cpu_count() or 1
+    files = []
+    for filename in expand_sources(path):
+        if os.path.isfile(filename):
+            files.append(filename)
+        else:
+            print(f"Error: The file '{filename}' was not found.")
+
+    # (info, [(lines read, invalid lines, store), ...]) per file
+    parsed = []
+    if len(files) == 1 and not is_gzip(files[0]):
+        filename = files[0]
+        info = {'source': filename, 'encoding': detect_encoding(filename), 'compressed': False,
+                'bytes': os.path.getsize(filename)}
+        tasks = []
+        if info['encoding'] is not None:
+            tasks = [(filename, info['encoding'], start, end)
+                     for start, end in split_file_ranges(filename, workers * chunks_per_worker)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parsed.append((info, list(executor.map(_parse_range_task, tasks))))
+    elif files:
+        with ProcessPoolExecutor(max_workers=min(workers, len(files))) as executor:
+            for info, records, invalid, columns in executor.map(_parse_file_task, files):
+                parsed.append((info, [(records, invalid, columns)]))
+
+    # Append in input order; map() returns results in task order
+    clean_transactions = TransactionColumns()
+    for info, parts in parsed:
+        start = len(clean_transactions)
+        info.update({'records': 0, 'invalid_removed': 0})
+        for records, invalid, columns in parts:
+            clean_transactions.extend(columns)
+            info['records'] += records
+            info['invalid_removed'] += invalid
+        info.update({'valid': info['records'] - info['invalid_removed'], 'rows': (start, len(clean_transactions))})
+
+    infos = [info for info, _ in parsed]
+    stats.update({'total_records': sum(info['records'] + 1 for info in infos),  # + each skipped header
+                  'invalid_removed': sum(info['invalid_removed'] for info in infos),
+                  'valid': len(clean_transactions), 'sources': infos})
+
+    # Validation Output Required
+    print_parse_summary(stats)
+    if len(infos) > 1:
+        for info in infos:
+            print(f"  {info['source']}: {info['records']} records, {info['invalid_removed']} invalid "
+                  f"({info['encoding']}{', gzip' if info['compressed'] else ''})")
+    return clean_transactions
+
+def files_report(path, product_mapping, output_file='output/sales_report.txt', workers=None, **filters):
+    """
+    Writes one merged report for all files of an input
+    filters: region, min_amount and max_amount, as in validate_and_filter
+    Returns: (aggregates, stats) used for the report
+    """
+    aggregates, stats, product_keys = parallel_aggregate_files(path, workers, **filters)
+    if not aggregates['transaction_count']:
+        print("No transactions to report.")
+        return aggregates, stats
+    generate_sales_report(
+        [], [], output_file, aggregates=aggregates,
+        enrichment=summarize_enrichment_from_keys(product_keys, product_mapping)
+    )
+    return aggregates, stats
@@ -1,129 +1,341 @@
 from datetime import datetime
+import csv
+import html
+import io
+import json
 import os
+from utils.columnar import date_to_day, day_to_date, date_sort_key
+from utils.data_processor import aggregate_transactions, top_selling_products, top_customers, distinct_mode_label
 
-def generate_sales_report(transactions, enriched_transactions, output_file='output/sales_report.txt'):
+def summarize_enrichment(enriched_transactions):
+    """Counts API matches and lists the products that could not be enriched"""
+    return {
+        'matched': sum(1 for t in enriched_transactions if t.get('API_Match')),
+        'total': len(enriched_transactions),
+        'failed_products': list(set([t['ProductName'] for t in enriched_transactions if not t.get('API_Match')]))
+    }
+
+# Report engine
+# A report is a list of sections. Each section declares the aggregates keys
+# it reads (plus 'enrichment' for the API summary), and a builder turns them
+# into plain data: {'title', 'fields': {name: value}, 'columns', 'rows'}.
+# Inputs are computed on first use, so a report without the enrichment
+# section never scans the enriched rows, and a report built from passed-in
+# aggregates never rescans the transactions. Renderers turn the section data
+# into the Task 3.3 text layout, JSON, CSV or HTML, written in one go.
+
+REPORT_FORMATS = ['text', 'json', 'csv', 'html']
+REPORT_EXTENSIONS = {'.json': 'json', '.csv': 'csv', '.html': 'html', '.htm': 'html'}
+
+class ReportContext:
+    """
+    Report inputs, computed on first use
+    needs: the inputs the requested sections read (see section_inputs); only
+    those accumulators are computed when no aggregates are passed in
+    """
+
+    def __init__(self, transactions, enriched_transactions, aggregates=None, enrichment=None, needs=None):
+        self.transactions = transactions
+        self.enriched_transactions = enriched_transactions
+        self.needs = section_inputs() if needs is None else needs
+        self._aggregates = aggregates
+        self._enrichment = enrichment
+        self.generated = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    @property
+    def aggregates(self):
+        if self._aggregates is None:
+            self._aggregates = aggregate_transactions(self.transactions, keys=self.needs)
+        return self._aggregates
+
+    @property
+    def enrichment(self):
+        if self._enrichment is None:
+            self._enrichment = summarize_enrichment(self.enriched_transactions)
+        return self._enrichment
+
+# Helper function for currency formatting (e.g., ₹15,45,000.00)
+def fmt_curr(val):
+    return f"₹{val:,.2f}"
+
+#  Section builders
+
+def build_header(ctx):
+    return {
+        'title': 'SALES ANALYTICS REPORT',
+        'fields': {'generated': ctx.generated, 'records_processed': ctx.aggregates['transaction_count']}
+    }
+
+def build_summary(ctx):
+    aggregates = ctx.aggregates
+    total_rev = aggregates['total_revenue']
+    # Cached day numbers, no per-row strptime; malformed dates are left out of the range
+    days = [day for day in map(date_to_day, aggregates['days']) if day is not None]
+    return {
+        'title': 'OVERALL SUMMARY',
+        'fields': {
+            'total_revenue': total_rev,
+            'total_transactions': aggregates['transaction_count'],
+            'average_order_value': total_rev / aggregates['transaction_count'],
+            'first_date': day_to_date(min(days)) if days else None,
+            'last_date': day_to_date(max(days)) if days else None
+        }
+    }
+
+def build_regions(ctx):
+    aggregates = ctx.aggregates
+    total_rev = aggregates['total_revenue']
+    # Sorted by sales amount descending
+    ordered = sorted(aggregates['regions'].items(), key=lambda x: x[1]['total_sales'], reverse=True)
+    return {
+        'title': 'REGION-WISE PERFORMANCE',
+        'columns': ['region', 'sales', 'percent_of_total', 'transactions'],
+        'rows': [[r, s['total_sales'], (s['total_sales'] / total_rev) * 100, s['transaction_count']]
+                 for r, s in ordered]
+    }
+
+def build_top_products(ctx):
+    top_p = top_selling_products(ctx.transactions, n=5, aggregates=ctx.aggregates)
+    return {
+        'title': 'TOP 5 PRODUCTS',
+        'columns': ['rank', 'product_name', 'quantity_sold', 'revenue'],
+        'rows': [[i, name, qty, rev] for i, (name, qty, rev) in enumerate(top_p, 1)]
+    }
+
+def build_top_customers(ctx):
+    top_c = top_customers(ctx.transactions, n=5, aggregates=ctx.aggregates)
+    return {
+        'title': 'TOP 5 CUSTOMERS',
+        'columns': ['rank', 'customer_id', 'total_spent', 'order_count'],
+        'rows': [[i, cid, data['total_spent'], data['purchase_count']] for i, (cid, data) in enumerate(top_c, 1)]
+    }
+
+def build_daily_trend(ctx):
+    d_stats = ctx.aggregates['days']
+    return {
+        'title': 'DAILY SALES TREND',
+        'fields': {'unique_customers_mode': distinct_mode_label(ctx.aggregates)},
+        'columns': ['date', 'revenue', 'transactions', 'unique_customers'],
+        'rows': [[d, d_stats[d]['revenue'], d_stats[d]['transaction_count'], len(d_stats[d]['customers'])]
+                 for d in sorted(d_stats, key=date_sort_key)]
+    }
+
+def build_product_performance(ctx):
+    aggregates = ctx.aggregates
+    peak_day = max(aggregates['days'].items(), key=lambda x: x[1]['revenue'])[0]
+    low_p = [n for n, (q, r) in aggregates['products'].items() if q < 10]
+    return {
+        'title': 'PRODUCT PERFORMANCE ANALYSIS',
+        'fields': {'best_selling_day': peak_day, 'low_performing_products': low_p},
+        # Avg transaction per region
+        'columns': ['region', 'average_transaction_value'],
+        'rows': [[r, s['total_sales'] / s['transaction_count']] for r, s in aggregates['regions'].items()]
+    }
+
+def build_enrichment(ctx):
+    enrichment = ctx.enrichment
+    return {
+        'title': 'API ENRICHMENT SUMMARY',
+        'fields': {
+            'total_products_enriched': enrichment['matched'],
+            'success_rate': (enrichment['matched'] / enrichment['total']) * 100,
+            'failed_products': enrichment['failed_products']
+        }
+    }
+
+#  Text layout (Task 3.3)
+
+RULE = "-" * 40
+
+def text_header(data):
+    fields = data['fields']
+    return ["===========================================",
+            "          SALES ANALYTICS REPORT           ",
+            f"Generated: {fields['generated']}",
+            f"Records Processed: {fields['records_processed']}",
+            "===========================================", ""]
+
+def text_summary(data):
+    fields = data['fields']
+    return [data['title'], RULE,
+            f"Total Revenue:      {fmt_curr(fields['total_revenue'])}",
+            f"Total Transactions: {fields['total_transactions']}",
+            f"Average Order Value: {fmt_curr(fields['average_order_value'])}",
+            f"Date Range:         {fields['first_date']} to {fields['last_date']}", ""]
+
+def text_regions(data):
+    lines = [data['title'], RULE, f"{'Region':<10} {'Sales':<15} {'% of Total':<12} {'Transactions'}"]
+    for r, sales, perc, count in data['rows']:
+        lines.append(f"{r:<10} {fmt_curr(sales):<15} {perc:>6.2f}% {count:>12}")
+    return lines + [""]
+
+def text_top_products(data):
+    lines = [data['title'], RULE, f"{'Rank':<5} {'Product Name':<15} {'Qty Sold':<10} {'Revenue'}"]
+    for i, name, qty, rev in data['rows']:
+        lines.append(f"{i:<5} {name:<15} {qty:<10} {fmt_curr(rev)}")
+    return lines + [""]
+
+def text_top_customers(data):
+    lines = [data['title'], RULE, f"{'Rank':<5} {'Customer ID':<15} {'Total Spent':<15} {'Order Count'}"]
+    for i, cid, spent, count in data['rows']:
+        lines.append(f"{i:<5} {cid:<15} {fmt_curr(spent):<15} {count}")
+    return lines + [""]
+
+def text_daily_trend(data):
+    lines = [data['title'], RULE, f"{'Date':<12} {'Revenue':<15} {'Trans':<8} {'Unique Customers'}"]
+    mode = data['fields']['unique_customers_mode']
+    if mode != 'exact':
+        lines.append(f"Unique customers are {mode}")
+    for d, revenue, count, unique in data['rows']:
+        lines.append(f"{d:<12} {fmt_curr(revenue):<15} {count:<8} {unique}")
+    return lines + [""]
+
+def text_product_performance(data):
+    fields = data['fields']
+    low_p = fields['low_performing_products']
+    lines = [data['title'], RULE,
+             f"Best selling day: {fields['best_selling_day']}",
+             f"Low performing products (<10 units): {', '.join(low_p) if low_p else 'None'}"]
+    for r, avg in data['rows']:
+        lines.append(f"Average transaction value ({r}): {fmt_curr(avg)}")
+    return lines + [""]
+
+def text_enrichment(data):
+    fields = data['fields']
+    failed = fields['failed_products']
+    return [data['title'], RULE,
+            f"Total products enriched: {fields['total_products_enriched']}",
+            f"Success rate percentage: {fields['success_rate']:.2f}%",
+            f"List of products that couldn't be enriched: {', '.join(failed) if failed else 'None'}"]
+
+# name -> (inputs read, builder, text layout), in report order
+SECTIONS = {
+    'header': (('transaction_count',), build_header, text_header),
+    'summary': (('total_revenue', 'transaction_count', 'days'), build_summary, text_summary),
+    'regions': (('total_revenue', 'regions'), build_regions, text_regions),
+    'top_products': (('products',), build_top_products, text_top_products),
+    'top_customers': (('customers',), build_top_customers, text_top_customers),
+    'daily_trend': (('days',), build_daily_trend, text_daily_trend),
+    'product_performance': (('days', 'products', 'regions'), build_product_performance, text_product_performance),
+    'enrichment': (('enrichment',), build_enrichment, text_enrichment),
+}
+
+def section_inputs(sections=None):
+    """Aggregates keys (and 'enrichment') read by the given sections"""
+    return {need for name in (sections or SECTIONS) for need in SECTIONS[name][0]}
+
+#  Renderers
+
+def render_text(report):
+    lines = []
+    for name, data in report['sections'].items():
+        lines.extend(SECTIONS[name][2](data))
+    return "\n".join(lines) + "\n"
+
+def render_json(report):
+    sections = {}
+    for name, data in report['sections'].items():
+        section = {'title': data['title']}
+        if 'fields' in data:
+            section['fields'] = data['fields']
+        if 'columns' in data:
+            section['rows'] = [dict(zip(data['columns'], row)) for row in data['rows']]
+        sections[name] = section
+    return json.dumps({'generated': report['generated'], 'sections': sections}, indent=2, ensure_ascii=False) + "\n"
+
+def render_csv(report):
+    """Long format: section, row, field, value (row is empty for section-level fields)"""
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(['section', 'row', 'field', 'value'])
+    for name, data in report['sections'].items():
+        for field, value in data.get('fields', {}).items():
+            if isinstance(value, list):
+                value = ';'.join(map(str, value))
+            writer.writerow([name, '', field, value])
+        for i, row in enumerate(data.get('rows', []), 1):
+            for column, value in zip(data['columns'], row):
+                writer.writerow([name, i, column, value])
+    return out.getvalue()
+
+def _html_cell(value):
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    if isinstance(value, list):
+        return html.escape(', '.join(map(str, value)) or 'None')
+    return html.escape(str(value))
+
+def _html_label(name):
+    return html.escape(name.replace('_', ' ').capitalize())
+
+def render_html(report):
+    parts = ['<!DOCTYPE html>',
+             '<html><head><meta charset="utf-8"><title>Sales Analytics Report</title>',
+             '<style>body{font-family:sans-serif}table{border-collapse:collapse;margin-bottom:1em}'
+             'th,td{border:1px solid #ccc;padding:2px 8px;text-align:left}</style></head><body>']
+    for data in report['sections'].values():
+        parts.append(f"<h2>{html.escape(data['title'])}</h2>")
+        if data.get('fields'):
+            parts.append('<table>')
+            for field, value in data['fields'].items():
+                parts.append(f"<tr><th>{_html_label(field)}</th><td>{_html_cell(value)}</td></tr>")
+            parts.append('</table>')
+        if 'columns' in data:
+            parts.append('<table><tr>' + ''.join(f"<th>{_html_label(c)}</th>" for c in data['columns']) + '</tr>')
+            for row in data['rows']:
+                parts.append('<tr>' + ''.join(f"<td>{_html_cell(v)}</td>" for v in row) + '</tr>')
+            parts.append('</table>')
+    parts.append('</body></html>')
+    return "\n".join(parts) + "\n"
+
+RENDERERS = {'text': render_text, 'json': render_json, 'csv': render_csv, 'html': render_html}
+
+def report_format(output_file, fmt=None):
+    """Explicit format, else from the extension (.json/.csv/.html), else 'text'"""
+    if fmt is None:
+        fmt = REPORT_EXTENSIONS.get(os.path.splitext(output_file)[1].lower(), 'text')
+    if fmt not in RENDERERS:
+        raise ValueError(f"Unknown report format '{fmt}'. Choose from {REPORT_FORMATS}")
+    return fmt
+
+def build_report(transactions, enriched_transactions, aggregates=None, enrichment=None, sections=None):
+    """
+    Builds the requested sections (default: all), always in report order
+    Returns: {'generated': timestamp, 'sections': {name: section data}}
+    """
+    if sections is not None:
+        unknown = [name for name in sections if name not in SECTIONS]
+        if unknown:
+            raise ValueError(f"Unknown report sections {unknown}. Choose from {list(SECTIONS)}")
+    names = [name for name in SECTIONS if sections is None or name in sections]
+    if aggregates is not None:
+        missing = sorted(section_inputs(names) - {'enrichment'} - set(aggregates))
+        if missing:
+            raise ValueError(f"Aggregates lack {missing}, needed by the requested sections")
+
+    ctx = ReportContext(transactions, enriched_transactions, aggregates, enrichment, section_inputs(names))
+    return {'generated': ctx.generated, 'sections': {name: SECTIONS[name][1](ctx) for name in names}}
+
+def generate_sales_report(transactions, enriched_transactions, output_file='output/sales_report.txt', aggregates=None,
+                          enrichment=None, sections=None, fmt=None):
     """
     Generates a comprehensive formatted text report following the exact order
     and formatting requirements specified in Task 3.3.
+    Pass the result of aggregate_transactions() to reuse the analysis scan,
+    and a summarize_enrichment()-style dict to skip rescanning enriched rows.
+    sections: names from SECTIONS to include (default: all)
+    fmt: 'text', 'json', 'csv' or 'html' (default: from the file extension)
     """
+    fmt = report_format(output_file, fmt)
+    content = RENDERERS[fmt](build_report(transactions, enriched_transactions, aggregates, enrichment, sections))
+
     # Create directory if it doesn't exist
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-
-    # Helper function for currency formatting (e.g., ₹15,45,000.00)
-    def fmt_curr(val):
-        return f"₹{val:,.2f}"
-
-    with open(output_file, 'w', encoding='utf-8') as f:
-        # 1. HEADER
-        f.write("===========================================\n")
-        f.write("          SALES ANALYTICS REPORT           \n")
-        f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Records Processed: {len(transactions)}\n")
-        f.write("===========================================\n\n")
-
-        # 2. OVERALL SUMMARY
-        total_rev = sum(t['Quantity'] * t['UnitPrice'] for t in transactions)
-        dates = [datetime.strptime(t['Date'], '%Y-%m-%d') for t in transactions]
-        f.write("OVERALL SUMMARY\n")
-        f.write("-" * 40 + "\n")
-        f.write(f"Total Revenue:      {fmt_curr(total_rev)}\n")
-        f.write(f"Total Transactions: {len(transactions)}\n")
-        f.write(f"Average Order Value: {fmt_curr(total_rev / len(transactions))}\n")
-        f.write(f"Date Range:         {min(dates).date()} to {max(dates).date()}\n\n")
-
-        # 3. REGION-WISE PERFORMANCE
-        f.write("REGION-WISE PERFORMANCE\n")
-        f.write("-" * 40 + "\n")
-        f.write(f"{'Region':<10} {'Sales':<15} {'% of Total':<12} {'Transactions'}\n")
-        
-        reg_stats = {}
-        for t in transactions:
-            r = t['Region']
-            rev = t['Quantity'] * t['UnitPrice']
-            reg_stats[r] = reg_stats.get(r, {'s': 0, 'c': 0})
-            reg_stats[r]['s'] += rev
-            reg_stats[r]['c'] += 1
-        
-        # Sorted by sales amount descending
-        for r, s in sorted(reg_stats.items(), key=lambda x: x[1]['s'], reverse=True):
-            perc = (s['s'] / total_rev) * 100
-            f.write(f"{r:<10} {fmt_curr(s['s']):<15} {perc:>6.2f}% {s['c']:>12}\n")
-        f.write("\n")
-
-        # 4. TOP 5 PRODUCTS
-        f.write("TOP 5 PRODUCTS\n")
-        f.write("-" * 40 + "\n")
-        f.write(f"{'Rank':<5} {'Product Name':<15} {'Qty Sold':<10} {'Revenue'}\n")
-        
-        p_stats = {}
-        for t in transactions:
-            name = t['ProductName']
-            p_stats[name] = p_stats.get(name, {'q': 0, 'r': 0})
-            p_stats[name]['q'] += t['Quantity']
-            p_stats[name]['r'] += (t['Quantity'] * t['UnitPrice'])
-            
-        top_p = sorted(p_stats.items(), key=lambda x: x[1]['q'], reverse=True)[:5]
-        for i, (name, data) in enumerate(top_p, 1):
-            f.write(f"{i:<5} {name:<15} {data['q']:<10} {fmt_curr(data['r'])}\n")
-        f.write("\n")
-
-        # 5. TOP 5 CUSTOMERS
-        f.write("TOP 5 CUSTOMERS\n")
-        f.write("-" * 40 + "\n")
-        f.write(f"{'Rank':<5} {'Customer ID':<15} {'Total Spent':<15} {'Order Count'}\n")
-        
-        c_stats = {}
-        for t in transactions:
-            cid = t['CustomerID']
-            c_stats[cid] = c_stats.get(cid, {'s': 0, 'c': 0})
-            c_stats[cid]['s'] += (t['Quantity'] * t['UnitPrice'])
-            c_stats[cid]['c'] += 1
-            
-        top_c = sorted(c_stats.items(), key=lambda x: x[1]['s'], reverse=True)[:5]
-        for i, (cid, data) in enumerate(top_c, 1):
-            f.write(f"{i:<5} {cid:<15} {fmt_curr(data['s']):<15} {data['c']}\n")
-        f.write("\n")
-
-        # 6. DAILY SALES TREND
-        f.write("DAILY SALES TREND\n")
-        f.write("-" * 40 + "\n")
-        f.write(f"{'Date':<12} {'Revenue':<15} {'Trans':<8} {'Unique Customers'}\n")
-        
-        d_stats = {}
-        for t in transactions:
-            d = t['Date']
-            rev = t['Quantity'] * t['UnitPrice']
-            d_stats[d] = d_stats.get(d, {'r': 0, 't': 0, 'u': set()})
-            d_stats[d]['r'] += rev
-            d_stats[d]['t'] += 1
-            d_stats[d]['u'].add(t['CustomerID'])
-            
-        for d in sorted(d_stats.keys()):
-            data = d_stats[d]
-            f.write(f"{d:<12} {fmt_curr(data['r']):<15} {data['t']:<8} {len(data['u'])}\n")
-        f.write("\n")
-
-        # 7. PRODUCT PERFORMANCE ANALYSIS
-        f.write("PRODUCT PERFORMANCE ANALYSIS\n")
-        f.write("-" * 40 + "\n")
-        peak_day = max(d_stats.items(), key=lambda x: x[1]['r'])[0]
-        low_p = [n for n, d in p_stats.items() if d['q'] < 10]
-        
-        f.write(f"Best selling day: {peak_day}\n")
-        f.write(f"Low performing products (<10 units): {', '.join(low_p) if low_p else 'None'}\n")
-        
-        # Avg transaction per region
-        for r, s in reg_stats.items():
-            f.write(f"Average transaction value ({r}): {fmt_curr(s['s']/s['c'])}\n")
-        f.write("\n")
-
-        # 8. API ENRICHMENT SUMMARY
-        f.write("API ENRICHMENT SUMMARY\n")
-        f.write("-" * 40 + "\n")
-        matches = [t for t in enriched_transactions if t.get('API_Match')]
-        failed = list(set([t['ProductName'] for t in enriched_transactions if not t.get('API_Match')]))
-        
-        success_rate = (len(matches) / len(enriched_transactions)) * 100
-        f.write(f"Total products enriched: {len(matches)}\n")
-        f.write(f"Success rate percentage: {success_rate:.2f}%\n")
-        f.write(f"List of products that couldn't be enriched: {', '.join(failed) if failed else 'None'}\n")
\ No newline at end of file
+    directory = os.path.dirname(output_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # One buffered write through a temp file + rename
+    tmp_file = f"{output_file}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_file, output_file)
@@ -0,0 +1,244 @@
+from datetime import date
+from utils.columnar import TransactionColumns, date_to_day, day_to_date
+from utils.data_processor import new_distinct
+
+# Time rollups
+# One scan builds day-level cubes of revenue, transactions, quantity and
+# distinct customers: overall, by region and by product. Week, month,
+# quarter and year levels are derived from the day cubes (never from raw
+# rows) the first time they are queried and then kept. A range query uses
+# the cached level for buckets that lie fully inside the range and the day
+# cubes for the partial buckets at its edges.
+
+GRANULARITIES = ['day', 'week', 'month', 'quarter', 'year']
+DIMENSIONS = [None, 'region', 'product']
+
+def bucket_start(day, granularity):
+    """Day number of the first day of the bucket containing day"""
+    if granularity == 'day':
+        return day
+    d = date.fromordinal(day)
+    if granularity == 'week':
+        return day - d.weekday()  # ISO weeks start on Monday
+    if granularity == 'month':
+        return date(d.year, d.month, 1).toordinal()
+    if granularity == 'quarter':
+        return date(d.year, 3 * ((d.month - 1) // 3) + 1, 1).toordinal()
+    if granularity == 'year':
+        return date(d.year, 1, 1).toordinal()
+    raise ValueError(f"Unknown granularity '{granularity}'. Choose from {GRANULARITIES}")
+
+def bucket_end(start, granularity):
+    """Day number of the last day of the bucket starting at start"""
+    if granularity == 'day':
+        return start
+    if granularity == 'week':
+        return start + 6
+    d = date.fromordinal(start)
+    months = {'month': 1, 'quarter': 3, 'year': 12}[granularity]
+    year, month = divmod(d.month - 1 + months, 12)
+    return date(d.year + year, month + 1, 1).toordinal() - 1
+
+def bucket_label(start, granularity):
+    """'2024-12-01', '2024-W48', '2024-12', '2024-Q4' or '2024'"""
+    d = date.fromordinal(start)
+    if granularity == 'day':
+        return d.isoformat()
+    if granularity == 'week':
+        year, week, _ = d.isocalendar()
+        return f"{year}-W{week:02d}"
+    if granularity == 'month':
+        return f"{d.year}-{d.month:02d}"
+    if granularity == 'quarter':
+        return f"{d.year}-Q{(d.month - 1) // 3 + 1}"
+    return str(d.year)
+
+def _new_cell():
+    # [revenue, transactions, quantity, distinct customers]
+    return [0.0, 0, 0, new_distinct()]
+
+def _fold_cell(target, source):
+    target[0] += source[0]
+    target[1] += source[1]
+    target[2] += source[2]
+    target[3] |= source[3]
+
+def _cell_stats(cell):
+    return {
+        'revenue': cell[0],
+        'transaction_count': cell[1],
+        'quantity': cell[2],
+        'unique_customers': len(cell[3])
+    }
+
+class SalesRollup:
+    """
+    Day-level sales cubes with week/month/quarter/year rollups
+
+    Usage:
+        rollup = SalesRollup.from_transactions(valid_data)
+        rollup.query('2024-01-01', '2024-12-31', granularity='month', dimension='region')
+    """
+
+    def __init__(self):
+        # level -> dimension -> bucket start day -> dimension value -> cell
+        self.levels = {'day': {dim: {} for dim in DIMENSIONS}}
+        self.first_day = None
+        self.last_day = None
+
+    @classmethod
+    def from_transactions(cls, transactions):
+        """Builds the day cubes in one scan (list of dictionaries or a TransactionColumns store)"""
+        rollup = cls()
+        if isinstance(transactions, TransactionColumns):
+            regions = transactions.values['Region']
+            products = transactions.values['ProductName']
+            customers = transactions.values['CustomerID']
+            codes = transactions.codes
+            for i, (qty, price, day) in enumerate(zip(transactions.quantity, transactions.unit_price,
+                                                      transactions.day)):
+                rollup.add_fields(day, regions[codes['Region'][i]], products[codes['ProductName'][i]],
+                                  customers[codes['CustomerID'][i]], qty, qty * price)
+        else:
+            for t in transactions:
+                rollup.add(t)
+        return rollup
+
+    def add(self, t):
+        """Folds one transaction dictionary into the day cubes"""
+        day = date_to_day(t['Date'])
+        if day is None:
+            raise ValueError(f"Malformed date '{t['Date']}' in transaction {t['TransactionID']}")
+        self.add_fields(day, t['Region'], t['ProductName'], t['CustomerID'],
+                        t['Quantity'], t['Quantity'] * t['UnitPrice'])
+
+    def add_fields(self, day, region, product, customer, qty, revenue):
+        """Folds one transaction, given as its fields, into the day cubes"""
+        days = self.levels['day']
+        for dim, value in ((None, None), ('region', region), ('product', product)):
+            cells = days[dim].get(day)
+            if cells is None:
+                cells = days[dim][day] = {}
+            cell = cells.get(value)
+            if cell is None:
+                cell = cells[value] = _new_cell()
+            cell[0] += revenue
+            cell[1] += 1
+            cell[2] += qty
+            cell[3].add(customer)
+
+        if self.first_day is None or day < self.first_day:
+            self.first_day = day
+        if self.last_day is None or day > self.last_day:
+            self.last_day = day
+        if len(self.levels) > 1:
+            self._drop_derived()
+
+    def _drop_derived(self):
+        """Forgets the derived levels after the day cubes changed"""
+        self.levels = {'day': self.levels['day']}
+
+    def merge(self, other):
+        """Folds another rollup (e.g. from another chunk or file) into this one"""
+        for dim, buckets in other.levels['day'].items():
+            target = self.levels['day'][dim]
+            for day, cells in buckets.items():
+                mine = target.setdefault(day, {})
+                for value, cell in cells.items():
+                    if value in mine:
+                        _fold_cell(mine[value], cell)
+                    else:
+                        mine[value] = [cell[0], cell[1], cell[2], cell[3].copy()]
+        for day in (other.first_day, other.last_day):
+            if day is not None:
+                self.first_day = day if self.first_day is None else min(self.first_day, day)
+                self.last_day = day if self.last_day is None else max(self.last_day, day)
+        self._drop_derived()
+        return self
+
+    def _level(self, granularity):
+        """Cubes for a granularity, derived from the day cubes on first use"""
+        level = self.levels.get(granularity)
+        if level is None:
+            if granularity not in GRANULARITIES:
+                raise ValueError(f"Unknown granularity '{granularity}'. Choose from {GRANULARITIES}")
+            level = self.levels[granularity] = {}
+            for dim, buckets in self.levels['day'].items():
+                derived = level[dim] = {}
+                for day, cells in buckets.items():
+                    self._fold_day(derived.setdefault(bucket_start(day, granularity), {}), cells)
+        return level
+
+    def precompute(self, granularities=GRANULARITIES):
+        """Derives the given levels now, so the first query does not pay for it"""
+        for granularity in granularities:
+            self._level(granularity)
+        return self
+
+    @staticmethod
+    def _fold_day(target, cells):
+        for value, cell in cells.items():
+            if value in target:
+                _fold_cell(target[value], cell)
+            else:
+                target[value] = [cell[0], cell[1], cell[2], cell[3].copy()]
+
+    def query(self, start_date=None, end_date=None, granularity='day', dimension=None):
+        """
+        Sales per time bucket within [start_date, end_date] ('YYYY-MM-DD', inclusive)
+        granularity: 'day', 'week', 'month', 'quarter' or 'year'
+        dimension: None (totals), 'region' or 'product'
+        Returns: {bucket label: stats} in time order, or {bucket label: {value: stats}}
+                 for a dimension; stats has revenue, transaction_count, quantity
+                 and unique_customers. Buckets are clipped to the range.
+        """
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension '{dimension}'. Choose from {DIMENSIONS[1:]}")
+        if self.first_day is None:
+            return {}
+        first = self.first_day if start_date is None else date_to_day(start_date)
+        last = self.last_day if end_date is None else date_to_day(end_date)
+        if first is None or last is None:
+            raise ValueError("Dates must be formatted as YYYY-MM-DD")
+
+        level = self._level(granularity)[dimension]
+        days = self.levels['day'][dimension]
+        result = {}
+        start = bucket_start(max(first, self.first_day), granularity)
+        while start <= min(last, self.last_day):
+            end = bucket_end(start, granularity)
+            if first <= start and end <= last:
+                cells = level.get(start)  # whole bucket inside the range
+            else:
+                cells = {}
+                for day in range(max(start, first), min(end, last) + 1):
+                    if day in days:
+                        self._fold_day(cells, days[day])
+            if cells:
+                label = bucket_label(start, granularity)
+                if dimension is None:
+                    result[label] = _cell_stats(cells[None])
+                else:
+                    # Highest revenue first within each bucket
+                    ordered = sorted(cells.items(), key=lambda x: x[1][0], reverse=True)
+                    result[label] = {value: _cell_stats(cell) for value, cell in ordered}
+            start = end + 1
+        return result
+
+    def peak(self, granularity='day', start_date=None, end_date=None):
+        """
+        Bucket with the highest revenue (like find_peak_sales_day, any granularity)
+        Returns: (bucket label, revenue, transaction count), or None if empty
+        """
+        trend = self.query(start_date, end_date, granularity)
+        if not trend:
+            return None
+        label = max(trend, key=lambda x: trend[x]['revenue'])
+        return (label, trend[label]['revenue'], trend[label]['transaction_count'])
+
+    @property
+    def date_range(self):
+        """(first date, last date) as 'YYYY-MM-DD' strings, or (None, None) if empty"""
+        if self.first_day is None:
+            return (None, None)
+        return (day_to_date(self.first_day), day_to_date(self.last_day))
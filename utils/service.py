@@ -0,0 +1,305 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from utils.file_handler import load_transactions_cached
+from utils.filter_index import FilterIndex
+from utils.api_handler import start_product_fetch, create_product_mapping, CACHE_TTL
+from utils.data_processor import (
+    aggregate_filters, region_wise_sales, top_selling_products, customer_analysis,
+    daily_sales_trend, find_peak_sales_day, low_performing_products
+)
+from utils.columnar import date_to_day, day_to_date
+from utils.incremental import summarize_enrichment_from_keys
+from utils.rollup import SalesRollup
+
+# Analytics service
+# A long-running process that loads the dataset once (through the parse
+# cache), keeps the filter index, the aggregates and the product mapping in
+# memory and answers analytics queries over HTTP as JSON. Serialized answers
+# are kept in an LRU cache. Every request stats the source file; when its
+# size or mtime changes the dataset is reloaded and the cache is cleared.
+# The product catalog is refetched in the background once it is older than
+# CACHE_TTL, while the previous mapping keeps serving.
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+RESULT_CACHE_SIZE = 256
+
+class ResultCache:
+    """Bounded LRU cache of serialized query results"""
+
+    def __init__(self, maxsize=RESULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        return {'size': len(self.entries), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+def _int_param(params, name, default):
+    value = params.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an integer") from None
+
+def _float_param(params, name):
+    value = params.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be a number") from None
+
+def _summary(aggregates):
+    """Overall summary of an aggregates dict (the report's OVERALL SUMMARY)"""
+    count = aggregates['transaction_count']
+    days = [day for day in map(date_to_day, aggregates['days']) if day is not None]
+    return {
+        'total_revenue': aggregates['total_revenue'],
+        'transaction_count': count,
+        'average_order_value': aggregates['total_revenue'] / count if count else 0,
+        'date_range': [day_to_date(min(days)), day_to_date(max(days))] if days else [None, None]
+    }
+
+class SalesService:
+    """
+    In-memory dataset plus the query handlers
+
+    Usage:
+        service = SalesService('data/sales_data.txt')
+        status, body = service.handle('/top-products', {'n': '10'})
+    """
+
+    def __init__(self, filename, cache_size=RESULT_CACHE_SIZE, catalog_ttl=CACHE_TTL):
+        # Reloads are keyed on one file's size/mtime, so directories and globs are not served
+        if not os.path.isfile(filename):
+            raise ValueError(f"The service needs a single sales data file, got '{filename}'")
+        self.filename = filename
+        self.cache = ResultCache(cache_size)
+        self.catalog_ttl = catalog_ttl
+        self.lock = threading.Lock()
+        self.version = None
+        self.product_mapping = create_product_mapping()  # last cached catalog until the fetch lands
+        self.catalog = None
+        self.catalog_loaded_at = None
+        self.refresh_catalog()
+        self.load()
+
+    def load(self):
+        """(Re)loads and indexes the source file, then clears the result cache"""
+        st = os.stat(self.filename)
+        transactions = load_transactions_cached(self.filename)
+        index = FilterIndex(transactions)
+        valid = index.select(index.valid)
+        (aggregates, product_keys), = aggregate_filters(valid, [{}])
+
+        self.transactions, self.index, self.valid = transactions, index, valid
+        self.aggregates, self.product_keys = aggregates, product_keys
+        self._rollup = None
+        self.version = (st.st_size, st.st_mtime_ns)
+        self.loaded_at = time.time()
+        self.cache.clear()
+        print(f"Loaded {len(self.valid)} valid transactions from {self.filename}")
+
+    def check_source(self):
+        """Reloads if the source file's size or mtime changed since the last load"""
+        st = os.stat(self.filename)
+        if (st.st_size, st.st_mtime_ns) != self.version:
+            with self.lock:
+                st = os.stat(self.filename)
+                if (st.st_size, st.st_mtime_ns) != self.version:
+                    self.load()
+
+    def refresh_catalog(self):
+        """Starts a background catalog fetch (the current mapping keeps serving)"""
+        self.catalog = start_product_fetch()
+
+    def check_catalog(self):
+        """Swaps in a finished catalog fetch and starts a new one once it is stale"""
+        with self.lock:
+            if self.catalog is not None and self.catalog.done():
+                try:
+                    products, messages = self.catalog.result()
+                    for message in messages:
+                        print(message)
+                    self.product_mapping = create_product_mapping(products)
+                    self.cache.clear()  # enrichment answers depend on the mapping
+                except Exception as e:
+                    print(f"Catalog refresh failed: {e}")
+                self.catalog = None
+                self.catalog_loaded_at = time.time()
+            if self.catalog is None and time.time() - self.catalog_loaded_at > self.catalog_ttl:
+                self.refresh_catalog()
+
+    @property
+    def rollup(self):
+        """Time rollup cubes, built on the first trend query"""
+        if self._rollup is None:
+            self._rollup = SalesRollup.from_transactions(self.valid)
+        return self._rollup
+
+    # Queries: params (query string values) -> JSON-serializable result
+
+    def query_health(self, params):
+        return {'status': 'ok', 'source': self.filename, 'rows': len(self.transactions),
+                'valid': len(self.valid), 'loaded_at': self.loaded_at, 'cache': self.cache.stats()}
+
+    def query_summary(self, params):
+        return _summary(self.aggregates)
+
+    def query_regions(self, params):
+        return region_wise_sales(self.valid, self.aggregates)
+
+    def query_top_products(self, params):
+        n = _int_param(params, 'n', 5)
+        return [{'product_name': name, 'quantity': qty, 'revenue': rev}
+                for name, qty, rev in top_selling_products(self.valid, n, self.aggregates)]
+
+    def query_customers(self, params):
+        return customer_analysis(self.valid, self.aggregates, n=_int_param(params, 'n', 5))
+
+    def query_daily(self, params):
+        return daily_sales_trend(self.valid, self.aggregates)
+
+    def query_trend(self, params):
+        return self.rollup.query(params.get('start'), params.get('end'),
+                                 granularity=params.get('granularity', 'day'),
+                                 dimension=params.get('dimension') or None)
+
+    def query_peak(self, params):
+        granularity = params.get('granularity', 'day')
+        if granularity == 'day' and 'start' not in params and 'end' not in params:
+            peak = find_peak_sales_day(self.valid, self.aggregates)
+        else:
+            peak = self.rollup.peak(granularity, params.get('start'), params.get('end'))
+        return None if peak is None else {'label': peak[0], 'revenue': peak[1], 'transaction_count': peak[2]}
+
+    def query_low_products(self, params):
+        threshold = _int_param(params, 'threshold', 10)
+        return [{'product_name': name, 'quantity': qty, 'revenue': rev}
+                for name, qty, rev in low_performing_products(self.valid, threshold, self.aggregates)]
+
+    def query_filter(self, params):
+        positions, by_region, by_amount = self.index.query(params.get('region'), _float_param(params, 'min'),
+                                                           _float_param(params, 'max'))
+        (aggregates, product_keys), = aggregate_filters(self.index.select(positions), [{}])
+        return {
+            'summary': _summary(aggregates),
+            'filtered_by_region': by_region,
+            'filtered_by_amount': by_amount,
+            'regions': region_wise_sales(None, aggregates),
+            'top_products': [{'product_name': name, 'quantity': qty, 'revenue': rev}
+                             for name, qty, rev in top_selling_products(None, _int_param(params, 'n', 5),
+                                                                        aggregates)],
+            'enrichment': summarize_enrichment_from_keys(product_keys, self.product_mapping)
+        }
+
+    def query_enrichment(self, params):
+        return summarize_enrichment_from_keys(self.product_keys, self.product_mapping)
+
+    ROUTES = {
+        '/health': ('query_health', False),  # (handler, cacheable)
+        '/summary': ('query_summary', True),
+        '/regions': ('query_regions', True),
+        '/top-products': ('query_top_products', True),
+        '/customers': ('query_customers', True),
+        '/daily': ('query_daily', True),
+        '/trend': ('query_trend', True),
+        '/peak': ('query_peak', True),
+        '/low-products': ('query_low_products', True),
+        '/filter': ('query_filter', True),
+        '/enrichment': ('query_enrichment', True),
+    }
+
+    def handle(self, path, params):
+        """
+        Answers one query
+        Returns: (HTTP status, JSON body as bytes)
+        """
+        route = self.ROUTES.get(path)
+        if route is None:
+            return 404, json.dumps({'error': f"Unknown query '{path}'", 'queries': list(self.ROUTES)}).encode()
+        name, cacheable = route
+
+        self.check_source()
+        self.check_catalog()
+        # The data version is part of the key, so an answer computed during a
+        # reload can never be served for the new data
+        key = (self.version, path, tuple(sorted(params.items())))
+        body = self.cache.get(key) if cacheable else None
+        if body is not None:
+            return 200, body
+
+        try:
+            body = json.dumps(getattr(self, name)(params)).encode('utf-8')
+        except ValueError as e:
+            return 400, json.dumps({'error': str(e)}).encode('utf-8')
+        if cacheable:
+            self.cache.put(key, body)
+        return 200, body
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """GET /<query>?param=value -> JSON"""
+
+    service = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            status, body = self.service.handle(url.path.rstrip('/') or '/health', params)
+        except Exception as e:
+            status, body = 500, json.dumps({'error': f"{type(e).__name__}: {e}"}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # one line per query would drown the load/reload messages
+
+def serve(filename, host=DEFAULT_HOST, port=DEFAULT_PORT, cache_size=RESULT_CACHE_SIZE):
+    """Loads the dataset and serves queries until interrupted"""
+    service = SalesService(filename, cache_size)
+    handler = type('SalesServiceHandler', (ServiceHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"Serving sales analytics on http://{host}:{server.server_port}/ "
+          f"(queries: {', '.join(service.ROUTES)})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        server.server_close()
@@ -0,0 +1,213 @@
+import heapq
+import math
+from array import array
+from functools import lru_cache
+from hashlib import blake2b
+from zlib import crc32
+
+# Streaming sketches
+# Fixed-memory summaries for unbounded streams. All structures are
+# mergeable, so chunk or worker partials can be combined like aggregates.
+#
+# SpaceSaving keeps at most `capacity` counters. Every reported count is an
+# overestimate by at most its recorded error, and the error never exceeds
+# total_weight / capacity, so any item heavier than that is guaranteed to
+# be tracked. capacity = ceil(1 / epsilon) gives an error of epsilon * total.
+#
+# CountMinSketch answers "how much weight did item x get" for any item in
+# width x depth counters: estimates never undercount and overcount by at
+# most epsilon * total with probability 1 - delta.
+
+DEFAULT_EPSILON = 0.001
+DEFAULT_DELTA = 0.01
+
+class SpaceSaving:
+    """Weighted Space-Saving heavy-hitter summary (top-k in fixed memory)"""
+
+    def __init__(self, capacity=None, epsilon=DEFAULT_EPSILON):
+        self.capacity = capacity or math.ceil(1 / epsilon)
+        self.total = 0
+        self.counters = {}  # item -> [count, error]
+        self._heap = []     # (count, item); entries go stale when a count grows
+
+    def add(self, item, weight=1):
+        """Adds weight (e.g. quantity or revenue) to item"""
+        self.total += weight
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += weight
+            return
+
+        if len(self.counters) < self.capacity:
+            self.counters[item] = [weight, 0]
+            heapq.heappush(self._heap, (weight, item))
+            return
+
+        # Full: the new item replaces the smallest counter and inherits its count
+        min_count, min_item = self._pop_min()
+        del self.counters[min_item]
+        self.counters[item] = [min_count + weight, min_count]
+        heapq.heappush(self._heap, (min_count + weight, item))
+
+    def _pop_min(self):
+        """Removes and returns the (count, item) with the smallest current count"""
+        heap = self._heap
+        while True:
+            count, item = heapq.heappop(heap)
+            counter = self.counters.get(item)
+            if counter is None:
+                continue
+            if counter[0] == count:
+                return count, item
+            heapq.heappush(heap, (counter[0], item))  # stale entry: requeue with the current count
+
+    @property
+    def error_bound(self):
+        """Largest possible overestimate of any reported count"""
+        return self.total / self.capacity
+
+    def top(self, n):
+        """
+        Returns the n heaviest items as (item, estimated count, max error),
+        highest first; estimated count - max error is a guaranteed lower bound
+        """
+        best = heapq.nlargest(n, self.counters.items(), key=lambda x: x[1][0])
+        return [(item, count, error) for item, (count, error) in best]
+
+    def merge(self, other):
+        """Folds another SpaceSaving summary into this one (keeps this capacity)"""
+        counters = {item: list(c) for item, c in self.counters.items()}
+        self_min = min((c[0] for c in self.counters.values()), default=0) \
+            if len(self.counters) >= self.capacity else 0
+        other_min = min((c[0] for c in other.counters.values()), default=0) \
+            if len(other.counters) >= other.capacity else 0
+
+        # Items missing from a full summary may have had up to its minimum count there
+        for item, c in counters.items():
+            if item not in other.counters:
+                c[0] += other_min
+                c[1] += other_min
+        for item, (count, error) in other.counters.items():
+            c = counters.get(item)
+            if c is None:
+                counters[item] = [count + self_min, error + self_min]
+            else:
+                c[0] += count
+                c[1] += error
+
+        kept = heapq.nlargest(self.capacity, counters.items(), key=lambda x: x[1][0])
+        self.counters = dict(kept)
+        self._heap = [(c[0], item) for item, c in kept]
+        heapq.heapify(self._heap)
+        self.total += other.total
+        return self
+
+class CountMinSketch:
+    """Count-Min sketch: point estimates of per-item weight in fixed memory"""
+
+    def __init__(self, epsilon=DEFAULT_EPSILON, delta=DEFAULT_DELTA, width=None, depth=None):
+        self.width = width or math.ceil(math.e / epsilon)
+        self.depth = depth or math.ceil(math.log(1 / delta))
+        self.total = 0
+        self.rows = [array('d', bytes(8 * self.width)) for _ in range(self.depth)]
+
+    def _columns(self, item):
+        # crc32 with a per-row seed: stable across processes (unlike hash())
+        data = str(item).encode('utf-8')
+        return [crc32(data, seed) % self.width for seed in range(1, self.depth + 1)]
+
+    def add(self, item, weight=1):
+        """Adds weight to item"""
+        self.total += weight
+        for row, col in zip(self.rows, self._columns(item)):
+            row[col] += weight
+
+    def estimate(self, item):
+        """Estimated weight of item (never below the true value)"""
+        return min(row[col] for row, col in zip(self.rows, self._columns(item)))
+
+    @property
+    def error_bound(self):
+        """Overestimate bound (holds with probability 1 - delta)"""
+        return math.e / self.width * self.total
+
+    def merge(self, other):
+        """Adds another sketch with the same width and depth into this one"""
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("Count-Min sketches must have the same width and depth to merge")
+        for row, other_row in zip(self.rows, other.rows):
+            for i, value in enumerate(other_row):
+                if value:
+                    row[i] += value
+        self.total += other.total
+        return self
+
+# HyperLogLog
+# Estimates the number of distinct items in 2**precision one-byte registers
+# (4 KB at the default precision of 12) with a relative standard error of
+# about 1.04 / sqrt(2**precision) (~1.6%). Sketches of the same precision
+# merge losslessly (register-wise max), across days, chunks or workers.
+
+DEFAULT_PRECISION = 12
+HASH_CACHE_SIZE = 65536
+
+@lru_cache(maxsize=HASH_CACHE_SIZE)
+def _hash64(item):
+    """Stable 64-bit hash (blake2b), memoized for repeating keys like CustomerIDs"""
+    return int.from_bytes(blake2b(str(item).encode('utf-8'), digest_size=8).digest(), 'big')
+
+class HyperLogLog:
+    """Mergeable approximate distinct counter; len() returns the estimate"""
+
+    def __init__(self, precision=DEFAULT_PRECISION):
+        if not 4 <= precision <= 18:
+            raise ValueError("HyperLogLog precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, item):
+        """Adds an item (any value with a stable str())"""
+        x = _hash64(item)
+        p = self.precision
+        index = x >> (64 - p)
+        rest = x & ((1 << (64 - p)) - 1)
+        rank = (64 - p) - rest.bit_length() + 1  # leading zeros + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        """Estimated number of distinct items added"""
+        m = len(self.registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting for small cardinalities
+        return int(round(estimate))
+
+    def __len__(self):
+        return self.count()
+
+    @property
+    def relative_error(self):
+        """Relative standard error of count()"""
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def describe(self):
+        """Short label for reports, e.g. 'HyperLogLog p=12, ±1.6%'"""
+        return f"HyperLogLog p={self.precision}, ±{self.relative_error:.1%}"
+
+    def merge(self, other):
+        """Folds another sketch of the same precision into this one"""
+        if other.precision != self.precision:
+            raise ValueError("HyperLogLog sketches must have the same precision to merge")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def __ior__(self, other):
+        return self.merge(other)
+
+    def copy(self):
+        clone = HyperLogLog(self.precision)
+        clone.registers = bytearray(self.registers)
+        return clone
@@ -0,0 +1,122 @@
+from utils.columnar import TransactionColumns
+
+# Optional NumPy backend for the aggregation engine
+# Group-bys run as bincount/unique reductions over the encoded columns.
+# Results are identical to the pure-Python engine: bincount and cumsum add
+# values sequentially in row order, and groups keep first-appearance order.
+
+# NumPy is imported on first use: it adds ~90 ms to every start-up (and to
+# every worker process) that never selects this backend
+np = None
+
+def _import_numpy():
+    """Imports NumPy into the module namespace (raises ImportError if missing)"""
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+    return np
+
+def numpy_available():
+    """Returns True if NumPy can be imported"""
+    try:
+        _import_numpy()
+    except ImportError:
+        return False
+    return True
+
+def _first_seen(codes):
+    """
+    Distinct codes ordered by first appearance
+    Returns: (codes in order, inverse index of each row into that order)
+    """
+    uniq, first, inverse = np.unique(codes, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return uniq[order], rank[inverse]
+
+def _group_sum(groups, weights, n):
+    """Sums weights per group in row order"""
+    return np.bincount(groups, weights=weights, minlength=n)
+
+def _distinct_pairs(groups, members, n_members):
+    """Returns the distinct (group, member) pairs"""
+    pairs = np.unique(groups.astype(np.int64) * n_members + members)
+    return pairs // n_members, pairs % n_members
+
+def _sets(n_groups, pair_groups, pair_members, names):
+    """Builds one set of decoded names per group from distinct pairs"""
+    sets = [set() for _ in range(n_groups)]
+    for g, m in zip(pair_groups.tolist(), pair_members.tolist()):
+        sets[g].add(names[m])
+    return sets
+
+def aggregate_columns_numpy(columns, aggregates):
+    """
+    Fills an empty aggregates dict (see new_aggregates) from a TransactionColumns store
+    Only the accumulators present in aggregates are computed
+    Returns: the same aggregates dict
+    """
+    if not isinstance(columns, TransactionColumns):
+        raise TypeError("aggregate_columns_numpy expects a TransactionColumns store")
+    _import_numpy()
+
+    qty = np.frombuffer(columns.quantity, dtype=np.int64)
+    price = np.frombuffer(columns.unit_price, dtype=np.float64)
+    revenue = qty * price
+
+    aggregates['transaction_count'] = len(columns)
+    if len(columns) == 0:
+        return aggregates
+    if 'total_revenue' in aggregates:
+        aggregates['total_revenue'] = float(np.cumsum(revenue)[-1])
+    product_codes = np.frombuffer(columns.codes['ProductName'], dtype=np.int32)
+    product_names = columns.values['ProductName']
+    customer_codes = np.frombuffer(columns.codes['CustomerID'], dtype=np.int32)
+    customer_ids = columns.values['CustomerID']
+
+    # Regions
+    if 'regions' in aggregates:
+        codes, groups = _first_seen(np.frombuffer(columns.codes['Region'], dtype=np.int32))
+        sales = _group_sum(groups, revenue, len(codes))
+        counts = np.bincount(groups, minlength=len(codes))
+        names = columns.values['Region']
+        for i, code in enumerate(codes.tolist()):
+            aggregates['regions'][names[code]] = {
+                'total_sales': float(sales[i]), 'transaction_count': int(counts[i])
+            }
+
+    # Products
+    if 'products' in aggregates:
+        codes, groups = _first_seen(product_codes)
+        quantities = np.bincount(groups, weights=qty, minlength=len(codes)).astype(np.int64)
+        sales = _group_sum(groups, revenue, len(codes))
+        for i, code in enumerate(codes.tolist()):
+            aggregates['products'][product_names[code]] = [int(quantities[i]), float(sales[i])]
+
+    # Customers (with the distinct products each one bought)
+    if 'customers' in aggregates:
+        codes, groups = _first_seen(customer_codes)
+        spent = _group_sum(groups, revenue, len(codes))
+        counts = np.bincount(groups, minlength=len(codes))
+        products = _sets(len(codes), *_distinct_pairs(groups, product_codes, len(product_names)), product_names)
+        for i, code in enumerate(codes.tolist()):
+            aggregates['customers'][customer_ids[code]] = {
+                'total_spent': float(spent[i]), 'purchase_count': int(counts[i]),
+                'products': products[i]
+            }
+
+    # Days (with the distinct customers per day)
+    if 'days' in aggregates:
+        days, groups = _first_seen(np.frombuffer(columns.day, dtype=np.int32))
+        revenue_per_day = _group_sum(groups, revenue, len(days))
+        counts = np.bincount(groups, minlength=len(days))
+        customers = _sets(len(days), *_distinct_pairs(groups, customer_codes, len(customer_ids)), customer_ids)
+        for i, day in enumerate(days.tolist()):
+            aggregates['days'][columns.date_string(day)] = {
+                'revenue': float(revenue_per_day[i]), 'transaction_count': int(counts[i]),
+                'customers': customers[i]
+            }
+
+    return aggregates